@@ -0,0 +1,113 @@
+"""Measure the startup time of the tarraz command and library imports.
+
+Every case runs in a fresh interpreter, the best and median times are shown:
+
+    $ python benchmarks/startup.py --runs 20
+
+A checkout of another revision is timed along to compare with it:
+
+    $ git worktree add /tmp/tarraz-base <revision>
+    $ python benchmarks/startup.py --baseline /tmp/tarraz-base
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+IMAGE = ROOT / "images" / "palestine.png"
+
+CASES = {
+    "python": "pass",
+    "import tarraz.main": "import tarraz.main",
+    "import tarraz.processor": "import tarraz.processor",
+    "tarraz --help": (
+        "import sys; sys.argv = ['tarraz', '--help']\n"
+        "from tarraz.main import main\n"
+        "try:\n"
+        "    main()\n"
+        "except SystemExit:\n"
+        "    pass"
+    ),
+    # What default_provider builds, also available in older revisions.
+    "DMC provider": "from tarraz.providers import DMCProvider; DMCProvider()",
+    "Tarraz(image)": (f"from tarraz.processor import Tarraz; Tarraz({str(IMAGE)!r})"),
+}
+
+
+def run(code: str, root: "Path") -> "Optional[float]":
+    """Milliseconds taken by the case in that checkout, None when it fails."""
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=root,
+        env=dict(os.environ, PYTHONPATH=str(root)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    if process.returncode:
+        return None
+
+    return (time.perf_counter() - start) * 1000
+
+
+def measure(code: str, runs: int, roots: "List[Path]") -> "List[List[float]]":
+    """Timings of the case in every checkout, empty for the ones it fails in.
+
+    Checkouts take turns, so a machine load change affects all of them alike.
+    """
+    timings: "List[List[float]]" = [[] for _ in roots]
+    failed = set()
+    for _ in range(runs):
+        for i, root in enumerate(roots):
+            if i in failed:
+                continue
+
+            timing = run(code, root)
+            if timing is None:
+                failed.add(i)
+                timings[i] = []
+            else:
+                timings[i].append(timing)
+
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Runs of every case.")
+    parser.add_argument(
+        "--baseline", type=Path, help="Checkout of tarraz to compare the cases with."
+    )
+    args = parser.parse_args()
+    roots = [ROOT, args.baseline] if args.baseline else [ROOT]
+
+    header = f"{'case':<26}{'best':>10}{'median':>10}"
+    if args.baseline:
+        header += f"{'baseline':>12}{'change':>9}"
+    print(header)
+
+    for name, code in CASES.items():
+        timings = measure(code, args.runs, roots)
+        if not timings[0]:
+            print(f"{name:<26}{'failed':>10}")
+            continue
+
+        best = min(timings[0])
+        line = f"{name:<26}{best:>8.1f}ms{statistics.median(timings[0]):>8.1f}ms"
+        if args.baseline and not timings[1]:
+            line += f"{'failed':>12}"
+        elif args.baseline:
+            baseline_best = min(timings[1])
+            change = (best - baseline_best) / baseline_best * 100
+            line += f"{baseline_best:>10.1f}ms{change:>+8.0f}%"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
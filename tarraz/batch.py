@@ -0,0 +1,152 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from tarraz.logger import logger
+from tarraz.models import Variant
+from tarraz.processor import Tarraz
+from tarraz.providers import provider_factory
+from tarraz.providers.shared import SharedPalette
+
+if TYPE_CHECKING:
+    from tarraz.models import ImageSize, Palette, PaletteImage
+    from tarraz.providers import ColorProvider
+
+PatternCallback = Callable[[str, "Variant"], None]
+Sweep = Tuple[List[int], List[int]]
+
+# Provider of the current worker process, built once by `_init_worker`.
+_provider: "Optional[ColorProvider]" = None
+
+
+class BatchResult(NamedTuple):
+    image_path: str
+    variants: "Tuple[Variant, ...]" = ()
+    error: "Optional[str]" = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def pattern(self) -> "Optional[PaletteImage]":
+        return self.variants[0].pattern if self.variants else None
+
+    @property
+    def colors(self) -> "Optional[Palette]":
+        return self.variants[0].colors if self.variants else None
+
+    @property
+    def size(self) -> "Optional[ImageSize]":
+        return self.variants[0].size if self.variants else None
+
+
+def _init_worker(
+    factory: "Callable[..., ColorProvider]", provider_options: "Dict[str, Any]"
+) -> None:
+    global _provider
+    _provider = factory(**provider_options)
+
+
+def _process_image(
+    image_path: str,
+    callback: "Optional[PatternCallback]",
+    sweep: "Optional[Sweep]",
+    options: dict,
+) -> "BatchResult":
+    logger.info("Generating pattern for %s...", image_path)
+    variants = []
+
+    try:
+        tarraz = Tarraz(image_path, provider=_provider, **options)
+
+        if sweep:
+            generated = tarraz.sweep(*sweep)
+        else:
+            pattern, colors = tarraz.process()
+            generated = [
+                Variant(tarraz.x_count, tarraz.colors_num, pattern, colors, tarraz.size)
+            ]
+
+        for variant in generated:
+            if callback:
+                callback(image_path, variant)
+            variants.append(variant)
+
+        logger.debug("Matching colors cache: %s", _provider.matching_colors.stats)
+    except Exception as e:
+        logger.exception("Failed to process %s.", image_path)
+        return BatchResult(image_path, error=f"{e.__class__.__name__}: {e}")
+
+    return BatchResult(image_path, tuple(variants))
+
+
+def process_batch(
+    image_paths: "Iterable[str]",
+    jobs: int = 1,
+    data_path: "Optional[str]" = None,
+    callback: "Optional[PatternCallback]" = None,
+    sweep: "Optional[Sweep]" = None,
+    table_bits: "Optional[int]" = None,
+    metric: str = "rgb",
+    provider: str = "dmc",
+    **options,
+) -> "Iterator[BatchResult]":
+    """Process images over a pool of `jobs` worker processes.
+
+    Every worker builds its color provider once and reuses it for all of its
+    images. `callback` is called from the worker with every generated pattern,
+    so it must be picklable. `sweep` is a (x_counts, colors_nums) tuple of
+    variants generated for every image, see `Tarraz.sweep`. `table_bits` makes
+    the providers match colors through a persisted lookup table, `metric` is the
+    providers color distance. The provider palette and lookup table are built
+    once and published in a shared memory file, mapped by every worker.
+    `provider` is the name of a registered provider, `data_path` overrides its
+    palette.
+    A failing image is reported in its result and doesn't stop the batch,
+    results are yielded in the images order.
+    """
+    image_paths = list(image_paths)
+    logger.info("Processing %d images using %d jobs...", len(image_paths), jobs)
+
+    # Resolved here, so workers don't depend on the registrations of this process.
+    factory = provider_factory(provider)
+    provider_options: "Dict[str, Any]" = {"table_bits": table_bits, "metric": metric}
+    if data_path:
+        provider_options["data_path"] = data_path
+
+    if jobs <= 1:
+        _init_worker(factory, provider_options)
+        for image_path in image_paths:
+            yield _process_image(image_path, callback, sweep, options)
+        return
+
+    # Built once up front, workers map its published palette and lookup table.
+    shared = SharedPalette(factory(**provider_options))
+    provider_options["data_path"] = str(shared.path)
+
+    with shared, ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(factory, provider_options),
+    ) as executor:
+        futures = [
+            executor.submit(_process_image, image_path, callback, sweep, options)
+            for image_path in image_paths
+        ]
+        for image_path, future in zip(image_paths, futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                # The worker itself died, the pool can't be trusted anymore.
+                yield BatchResult(image_path, error=f"{e.__class__.__name__}: {e}")
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import struct
+from array import array
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from tarraz import constants
+from tarraz.files import atomic_write
+from tarraz.logger import logger
+from tarraz.models import RGB, Color, PaletteImage
+
+if TYPE_CHECKING:
+    from tarraz.models import Palette
+    from tarraz.providers import ColorProvider
+
+CachedPattern = Tuple["PaletteImage", "Palette"]
+
+# Magic, version, width, height, pattern typecode and colors count.
+HEADER = struct.Struct("<4sBIIcH")
+MAGIC = b"TRZP"
+VERSION = 1
+
+
+def _pack_str(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return struct.pack("<H", len(data)) + data
+
+
+def _unpack_str(data: memoryview, offset: int) -> "Tuple[str, int]":
+    (length,) = struct.unpack_from("<H", data, offset)
+    offset += 2
+    return bytes(data[offset : offset + length]).decode("utf-8"), offset + length
+
+
+def dump_pattern(pattern: "PaletteImage", colors: "Palette") -> bytes:
+    """Compact binary form of a pattern and its palette."""
+    typecode = pattern.data.typecode.encode("ascii")
+    chunks = [
+        HEADER.pack(
+            MAGIC, VERSION, pattern.width, pattern.height, typecode, len(colors)
+        ),
+        pattern.data.tobytes(),
+    ]
+    for color in colors:
+        chunks.append(bytes(color.rgb))
+        chunks.append(_pack_str(color.code))
+        chunks.append(_pack_str(color.name))
+
+    return b"".join(chunks)
+
+
+def load_pattern(data: bytes, provider: "ColorProvider") -> "CachedPattern":
+    """Read a pattern dumped by `dump_pattern`, colors come from the provider."""
+    magic, version, width, height, typecode, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Unsupported cached pattern format.")
+
+    view = memoryview(data)
+    pattern_data = array(typecode.decode("ascii"))
+    offset = HEADER.size + width * height * pattern_data.itemsize
+    pattern_data.frombytes(view[HEADER.size : offset])
+
+    colors = []
+    for _ in range(count):
+        rgb = RGB(*view[offset : offset + 3])
+        code, offset = _unpack_str(view, offset + 3)
+        name, offset = _unpack_str(view, offset)
+
+        # Same provider objects, as in a freshly generated pattern.
+        colors.append(provider.get(rgb) or Color(code=code, rgb=rgb, name=name))
+
+    return PaletteImage(width, height, pattern_data), colors
+
+
+class PatternCache(object):
+    """On disk cache of generated patterns, addressed by their inputs content.
+
+    Entries are keyed by the source image content, the processing options and
+    the provider palette. The least recently used entries are evicted once the
+    cache grows over `max_size` bytes, as far as this process knows: its size is
+    scanned once, then only counted from the stored entries until over budget.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = constants.CACHE_SIZE) -> None:
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self._digests: "Dict[Tuple[str, int, int], str]" = {}
+        # Bytes used by the entries at the last scan plus the ones stored since.
+        self._size: "Optional[int]" = None
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __getstate__(self) -> dict:
+        return {"cache_dir": self.cache_dir, "max_size": self.max_size}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def _file_digest(self, image_path: str) -> str:
+        stat = os.stat(image_path)
+        key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
+
+        if key not in self._digests:
+            digest = hashlib.sha256()
+            with open(image_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            self._digests[key] = digest.hexdigest()
+
+        return self._digests[key]
+
+    def key(self, image_path: str, provider: "ColorProvider", options: dict) -> str:
+        digest = hashlib.sha256()
+        digest.update(self._file_digest(image_path).encode("ascii"))
+        digest.update(provider.fingerprint.encode("ascii"))
+        digest.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.trz")
+
+    def get(self, key: str, provider: "ColorProvider") -> "Optional[CachedPattern]":
+        path = self._path(key)
+
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Bump the entry as recently used.
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        try:
+            cached = load_pattern(data, provider)
+        except (ValueError, struct.error) as e:
+            logger.warning("Ignoring invalid cached pattern %s: %s", path, e)
+            return None
+
+        logger.info("Loaded pattern %s from cache.", key)
+        return cached
+
+    def put(self, key: str, pattern: "PaletteImage", colors: "Palette") -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Written aside and moved in place, readers never see partial entries.
+        data = dump_pattern(pattern, colors)
+        with atomic_write(path) as f:
+            f.write(data)
+
+        logger.debug("Stored pattern %s in cache.", key)
+        if self._size is not None:
+            self._size += len(data)
+
+        if self._size is None or self._size > self.max_size:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits its size."""
+        entries = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(".trz"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        # Evicted by another process meanwhile.
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+
+            logger.debug("Evicting cached pattern %s...", path)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+        self._size = size
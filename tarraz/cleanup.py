@@ -0,0 +1,271 @@
+from typing import TYPE_CHECKING, List, Tuple
+
+from tarraz.compat import HAS_NUMPY, numpy, require_numpy
+from tarraz.logger import logger
+from tarraz.models import Coordinate
+from tarraz.utils import get_neighbours, index_of
+
+if TYPE_CHECKING:
+    from tarraz.models import PaletteImage
+
+Shift = Tuple[int, int]
+
+# Regions and colors border scores computed at once by the regions cleanup.
+SCORES_SIZE = 1 << 24
+
+
+def neighbour_shifts(radius: int) -> "List[Shift]":
+    """(dy, dx) offsets of the neighbours of a stitch within the radius."""
+    return [
+        (dy, dx)
+        for dy in range(-radius, radius + 1)
+        for dx in range(-radius, radius + 1)
+        if dy or dx
+    ]
+
+
+def is_visited_before(shift: "Shift") -> bool:
+    """Whether a neighbour comes first in the column by column cleanup order."""
+    dy, dx = shift
+    return dx < 0 or (dx == 0 and dy < 0)
+
+
+def remove_isolated(pattern: "PaletteImage", radius: int = 1, passes: int = 1) -> None:
+    """Replace stitches sharing no color with their neighbours by the neighbours mode.
+
+    Stitches are visited column by column and updated in place, so a stitch sees
+    the already cleaned up stitches before it, ties go to the lowest palette index.
+    """
+    for i in range(passes):
+        logger.debug("Cleanup pass %d/%d...", i + 1, passes)
+
+        if HAS_NUMPY:
+            changed = _remove_isolated_numpy(pattern, radius)
+        else:
+            changed = _remove_isolated_python(pattern, radius)
+
+        logger.debug("%d isolated stitches cleaned up.", changed)
+        if not changed:
+            break
+
+
+def _remove_isolated_python(pattern: "PaletteImage", radius: int) -> int:
+    changed = 0
+
+    for x in range(pattern.width):
+        for y in range(pattern.height):
+            coordinate = Coordinate(y, x)
+            neighbours = get_neighbours(coordinate, pattern, width=radius)
+
+            if neighbours and index_of(neighbours, pattern[y][x]) == -1:
+                mode = max(neighbours, key=neighbours.count)
+                pattern[y][x] = mode
+                changed += 1
+
+    return changed
+
+
+def _remove_isolated_numpy(pattern: "PaletteImage", radius: int) -> int:
+    grid = pattern.numpy()
+    height, width = grid.shape
+    shifts = neighbour_shifts(radius)
+
+    original = grid.astype(numpy.int32)
+    padded = numpy.full((height + 2 * radius, width + 2 * radius), -1, numpy.int32)
+    padded[radius : radius + height, radius : radius + width] = original
+
+    # Every neighbour of every stitch, -1 outside of the pattern.
+    neighbours = numpy.stack(
+        [
+            padded[
+                radius + dy : radius + dy + height, radius + dx : radius + dx + width
+            ]
+            for dy, dx in shifts
+        ]
+    )
+    isolated = (neighbours >= 0).any(axis=0) & ~(neighbours == original).any(axis=0)
+
+    if not isolated.any():
+        return 0
+
+    # Only stitches with an isolated neighbour visited before them can see a
+    # changed neighbourhood, the rest are cleaned up all at once.
+    padded_isolated = numpy.zeros(padded.shape, dtype=bool)
+    padded_isolated[radius : radius + height, radius : radius + width] = isolated
+    dependent = numpy.zeros_like(isolated)
+    for dy, dx in filter(is_visited_before, shifts):
+        dependent |= padded_isolated[
+            radius + dy : radius + dy + height, radius + dx : radius + dx + width
+        ]
+    dependent &= isolated
+    independent = isolated & ~dependent
+
+    ys, xs = numpy.nonzero(independent)
+    grid[ys, xs] = _neighbours_mode(neighbours[:, ys, xs])
+    changed = len(ys)
+
+    # Column by column order, same as the pure python cleanup.
+    ys, xs = numpy.nonzero(dependent.T)[::-1]
+    for y, x in zip(ys.tolist(), xs.tolist()):
+        values = []
+        for shift in shifts:
+            ny, nx = y + shift[0], x + shift[1]
+            if 0 <= ny < height and 0 <= nx < width:
+                source = grid if is_visited_before(shift) else original
+                values.append(int(source[ny, nx]))
+
+        if grid[y, x] not in values:
+            values.sort()
+            grid[y, x] = max(values, key=values.count)
+            changed += 1
+
+    return changed
+
+
+def _neighbours_mode(neighbours):
+    """Most common value of every column, the lowest one wins on ties."""
+    counts = (neighbours[:, None, :] == neighbours[None, :, :]).sum(axis=1)
+    counts[neighbours < 0] = -1
+
+    top = int(neighbours.max(initial=0)) + 1
+    scores = counts.astype(numpy.int64) * top + (top - 1 - neighbours)
+
+    return neighbours[scores.argmax(axis=0), numpy.arange(neighbours.shape[1])]
+
+
+def label_regions(grid):
+    """Label the 8-connected regions of same colored stitches.
+
+    Horizontal runs of a color are found at once, then the touching runs of
+    consecutive rows are joined by propagating the lowest run of every region,
+    every step over all the links at once.
+    """
+    height, width = grid.shape
+    flat = grid.ravel()
+
+    starts = numpy.ones(flat.shape, dtype=bool)
+    starts[1:] = flat[1:] != flat[:-1]
+    starts[::width] = True
+    runs = (numpy.cumsum(starts) - 1).reshape(height, width)
+    runs_count = int(runs[-1, -1]) + 1
+
+    # Runs of consecutive rows touching each other with the same color.
+    below_runs, above_runs = [], []
+    for dx in (-1, 0, 1):
+        below = numpy.s_[1:, max(dx, 0) : width + min(dx, 0)]
+        above = numpy.s_[:-1, max(-dx, 0) : width + min(-dx, 0)]
+        same = grid[below] == grid[above]
+        below_runs.append(runs[below][same])
+        above_runs.append(runs[above][same])
+    below_runs = numpy.concatenate(below_runs)
+    above_runs = numpy.concatenate(above_runs)
+
+    # Every root is hooked to the lowest root linked to it, then every run is
+    # pointed straight at its root, until linked runs share their root.
+    roots = numpy.arange(runs_count)
+    while True:
+        below_roots, above_roots = roots[below_runs], roots[above_runs]
+        unjoined = below_roots != above_roots
+        if not unjoined.any():
+            break
+
+        below_runs, above_runs = below_runs[unjoined], above_runs[unjoined]
+        below_roots, above_roots = below_roots[unjoined], above_roots[unjoined]
+        numpy.minimum.at(roots, below_roots, above_roots)
+        numpy.minimum.at(roots, above_roots, below_roots)
+
+        while True:
+            jumped = roots[roots]
+            if (jumped == roots).all():
+                break
+            roots = jumped
+
+    # Regions are numbered in the order of their first run.
+    is_root = roots == numpy.arange(runs_count)
+    labels = (numpy.cumsum(is_root) - 1)[roots]
+    return labels[runs], int(is_root.sum())
+
+
+def merge_regions(
+    pattern: "PaletteImage", min_region_size: int = 6, passes: int = 1
+) -> None:
+    """Merge regions smaller than `min_region_size` into their dominant neighbour.
+
+    The dominant neighbour is the color bordering the region the most, big
+    regions take precedence over other small ones, ties go to the lowest index.
+    """
+    require_numpy("The regions cleanup")
+
+    for i in range(passes):
+        logger.debug("Regions cleanup pass %d/%d...", i + 1, passes)
+
+        changed = _merge_regions(pattern.numpy(), min_region_size)
+
+        logger.debug("%d small regions merged.", changed)
+        if not changed:
+            break
+
+
+def _merge_regions(grid, min_region_size: int) -> int:
+    height, width = grid.shape
+    labels, regions_count = label_regions(grid)
+
+    small = numpy.bincount(labels.ravel(), minlength=regions_count) < min_region_size
+    if regions_count < 2 or not small.any():
+        return 0
+
+    colors_count = int(grid.max()) + 1
+    big_weight = height * width * 8 + 1
+
+    # Stitches bordering small regions, keyed by the region position among the
+    # small ones and the bordering color. Stitches of big regions have no position.
+    small_count = int(small.sum())
+    positions = numpy.full(regions_count, -1, dtype=numpy.intp)
+    positions[small] = numpy.arange(small_count)
+    stitch_positions = positions[labels]
+    stitch_weights = numpy.where(stitch_positions >= 0, 1.0, big_weight)
+
+    keys, weights = [], []
+    for dy, dx in neighbour_shifts(1):
+        cells = numpy.s_[
+            max(-dy, 0) : height + min(-dy, 0), max(-dx, 0) : width + min(-dx, 0)
+        ]
+        neighbours = numpy.s_[
+            max(dy, 0) : height + min(dy, 0), max(dx, 0) : width + min(dx, 0)
+        ]
+        cell_positions = stitch_positions[cells]
+
+        border = (cell_positions >= 0) & (labels[cells] != labels[neighbours])
+        keys.append(cell_positions[border] * colors_count + grid[neighbours][border])
+        weights.append(stitch_weights[neighbours][border])
+
+    keys, weights = numpy.concatenate(keys), numpy.concatenate(weights)
+
+    # Best scored color of every small region, lowest color on ties. Regions
+    # are scored by chunks, bounding the table with many colors.
+    chunk = max(1, SCORES_SIZE // colors_count)
+    best = numpy.empty(small_count, dtype=numpy.intp)
+    bordered = numpy.empty(small_count, dtype=bool)
+    for start in range(0, small_count, chunk):
+        end = min(start + chunk, small_count)
+        chunk_keys, chunk_weights = keys, weights
+        if (start, end) != (0, small_count):
+            in_chunk = (keys >= start * colors_count) & (keys < end * colors_count)
+            chunk_keys, chunk_weights = keys[in_chunk], weights[in_chunk]
+
+        scores = numpy.bincount(
+            chunk_keys - start * colors_count,
+            chunk_weights,
+            minlength=(end - start) * colors_count,
+        ).reshape(end - start, colors_count)
+        best[start:end] = scores.argmax(axis=1)
+        bordered[start:end] = scores.max(axis=1) > 0
+
+    replacements = numpy.full(regions_count, -1, dtype=numpy.int64)
+    replacements[numpy.flatnonzero(small)[bordered]] = best[bordered]
+
+    targets = replacements[labels]
+    merged = targets >= 0
+    grid[merged] = targets[merged]
+
+    return int(bordered.sum())
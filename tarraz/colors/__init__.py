@@ -1,3 +1,16 @@
-from .dmc import COLORS as DMC_COLORS
+from pathlib import Path
 
-__all__ = ("DMC_COLORS",)
+# DMC palette compiled from `dmc.COLORS`, rebuilt by `python -m tarraz.colors`.
+DMC_PALETTE = Path(__file__).resolve().parent / "dmc.bin"
+
+__all__ = ("DMC_COLORS", "DMC_PALETTE")
+
+
+def __getattr__(name: str):
+    # The raw colors are only parsed when the compiled palette isn't used.
+    if name == "DMC_COLORS":
+        from .dmc import COLORS
+
+        return COLORS
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
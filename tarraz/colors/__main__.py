@@ -0,0 +1,7 @@
+from tarraz.colors import DMC_COLORS, DMC_PALETTE
+from tarraz.models import Color
+from tarraz.providers.compiled import write_palette
+
+if __name__ == "__main__":
+    write_palette(DMC_PALETTE, Color.create(DMC_COLORS))
+    print(f"Compiled {DMC_PALETTE}.")
@@ -0,0 +1,38 @@
+import importlib
+import importlib.util
+
+
+class _LazyModule(object):
+    """Module imported on its first attribute access, keeps imports fast."""
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+
+    def __getattr__(self, attr: str):
+        value = getattr(importlib.import_module(self._name), attr)
+        # Later accesses don't go through this hook anymore.
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'>"
+
+
+def _has_module(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+HAS_NUMPY = _has_module("numpy")
+
+# numpy is an optional extra
+numpy = _LazyModule("numpy") if HAS_NUMPY else None
+
+
+def require_numpy(feature: str) -> None:
+    if not HAS_NUMPY:
+        raise ImportError(
+            f"{feature} requires numpy, install it with `pip install tarraz[fast]`."
+        )
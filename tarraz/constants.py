@@ -1,8 +1,33 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-IMAGE_EXTENSIONS = (".jpeg", ".jpg", ".png", ".webp")
-COLORS_EXTENSIONS = (".json",)
+IMAGE_EXTENSIONS = (".jpeg", ".jpg", ".png", ".webp", ".tif", ".tiff", ".bmp")
+COMPILED_COLORS_EXTENSION = ".bin"
+COLORS_EXTENSIONS = (".json", COMPILED_COLORS_EXTENSION)
+ENGINES = ("auto", "numpy", "python")
+REDUCERS = ("box", "median", "dominant")
+CLEANUP_MODES = ("isolated", "regions")
+METRICS = ("rgb", "cie76", "ciede2000")
+
+# Source pixels per stitch kept when decoding images at a reduced scale.
+DECODE_OVERSAMPLING = 8
+
+# Bytes the streaming mode may use for the decoded strips.
+MEMORY_BUDGET = 64 * 1024 * 1024
+
+# Matching colors remembered by every provider.
+MATCH_CACHE_SIZE = 1 << 16
+
+# Bytes the patterns cache may use on disk.
+CACHE_SIZE = 256 * 1024 * 1024
+
+# Default directory of the persisted color lookup tables.
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "tarraz"
+
+# Bits per channel of the color lookup tables, 8 bits holds every RGB color.
+TABLE_BITS = 8
+TABLE_BITS_CHOICES = (5, 6, 8)
 
 SVG_VARIANTS = [
     {
@@ -19,6 +44,7 @@ SVG_VARIANTS = [
         "symbols": True,
         "mid_arrows": True,
         "major_gridlines": True,
+        "merge_cells": True,
     },
     {
         "name": "black_white_symbols",
@@ -27,6 +53,7 @@ SVG_VARIANTS = [
         "symbols": True,
         "mid_arrows": True,
         "major_gridlines": True,
+        "merge_cells": True,
     },
     {
         "name": "colored",
@@ -35,5 +62,6 @@ SVG_VARIANTS = [
         "symbols": False,
         "mid_arrows": False,
         "major_gridlines": False,
+        "merge_cells": True,
     },
 ]
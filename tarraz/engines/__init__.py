@@ -0,0 +1,11 @@
+from .engine import Translation, TranslationEngine, get_engine
+from .python import PythonEngine
+from .vectorized import NumpyEngine
+
+__all__ = (
+    "NumpyEngine",
+    "PythonEngine",
+    "Translation",
+    "TranslationEngine",
+    "get_engine",
+)
@@ -0,0 +1,46 @@
+from abc import ABC
+from typing import TYPE_CHECKING, Any, List, NamedTuple, Optional
+
+from tarraz.compat import HAS_NUMPY
+
+if TYPE_CHECKING:
+    from PIL.Image import Image as ImageType
+
+    from tarraz.providers import ColorProvider
+
+
+class Translation(NamedTuple):
+    # Grid of provider color indices and the grid of their rgb values.
+    indices: Any
+    colors: Any
+
+
+class TranslationEngine(ABC):
+    name = ""
+
+    def translate(
+        self, image: "ImageType", provider: "ColorProvider", step: int = 1
+    ) -> NotImplemented:
+        """Match every `step`th pixel of the image to a provider color."""
+        return NotImplemented
+
+    def to_image(self, translation: "Translation") -> NotImplemented:
+        return NotImplemented
+
+    def join(self, translations: "List[Translation]") -> NotImplemented:
+        """Stack translations of consecutive rows of stitches."""
+        return NotImplemented
+
+    def __str__(self):
+        return f"Engine<{self.name}>"
+
+
+def get_engine(name: "Optional[str]" = None) -> "TranslationEngine":
+    if not name or name == "auto":
+        name = "numpy" if HAS_NUMPY else "python"
+
+    for engine in TranslationEngine.__subclasses__():
+        if engine.name == name:
+            return engine()
+
+    raise ValueError(f"Unknown translation engine '{name}'.")
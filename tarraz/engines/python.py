@@ -0,0 +1,53 @@
+from typing import TYPE_CHECKING, List
+
+from tarraz.engines.engine import Translation, TranslationEngine
+from tarraz.models import RGB, Coordinate
+
+if TYPE_CHECKING:
+    from PIL.Image import Image as ImageType
+
+    from tarraz.models import RGBImage, RGBImageRow
+    from tarraz.providers import ColorProvider
+
+
+class PythonEngine(TranslationEngine):
+    """Pure python engine, matches the image one pixel at a time."""
+
+    name = "python"
+
+    def translate(
+        self, image: "ImageType", provider: "ColorProvider", step: int = 1
+    ) -> "Translation":
+        width, height = image.size
+        positions = {id(color): i for i, color in enumerate(provider.colors)}
+
+        indices: "List[List[int]]" = []
+        colors: "RGBImage" = []
+        for y in range(0, height, step):
+            indices_row: "List[int]" = []
+            row: "RGBImageRow" = []
+            for x in range(0, width, step):
+                # Ignore alpha value incase we have a png
+                pixel = RGB(*image.getpixel(Coordinate(x, y))[:3])
+                matching_color = provider.get_matching_color(pixel)
+                indices_row.append(positions[id(matching_color)])
+                row.append(matching_color.rgb)
+            indices.append(indices_row)
+            colors.append(row)
+
+        return Translation(indices, colors)
+
+    def to_image(self, translation: "Translation") -> "ImageType":
+        # The utils pull argparse in, only imported once an image is generated.
+        from tarraz.utils import generate_image
+
+        return generate_image(translation.colors)
+
+    def join(self, translations: "List[Translation]") -> "Translation":
+        indices: "List[List[int]]" = []
+        colors: "RGBImage" = []
+        for translation in translations:
+            indices.extend(translation.indices)
+            colors.extend(translation.colors)
+
+        return Translation(indices, colors)
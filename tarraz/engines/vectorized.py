@@ -0,0 +1,39 @@
+from typing import TYPE_CHECKING, List
+
+from PIL import Image
+
+from tarraz.compat import numpy, require_numpy
+from tarraz.engines.engine import Translation, TranslationEngine
+
+if TYPE_CHECKING:
+    from PIL.Image import Image as ImageType
+
+    from tarraz.providers import ColorProvider
+
+
+class NumpyEngine(TranslationEngine):
+    """Array backed engine, matches all the unique colors of the image at once."""
+
+    name = "numpy"
+
+    def __init__(self) -> None:
+        require_numpy("The numpy translation engine")
+
+    def translate(
+        self, image: "ImageType", provider: "ColorProvider", step: int = 1
+    ) -> "Translation":
+        # Ignore alpha value incase we have a png
+        pixels = numpy.asarray(image)[::step, ::step, :3]
+        palette = provider.store.numpy()
+        indices = provider.nearest_indices(pixels)
+
+        return Translation(indices, palette[indices])
+
+    def to_image(self, translation: "Translation") -> "ImageType":
+        return Image.fromarray(translation.colors)
+
+    def join(self, translations: "List[Translation]") -> "Translation":
+        return Translation(
+            numpy.concatenate([translation.indices for translation in translations]),
+            numpy.concatenate([translation.colors for translation in translations]),
+        )
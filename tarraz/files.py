@@ -0,0 +1,36 @@
+import functools
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, Union
+
+
+@functools.lru_cache(maxsize=None)
+def _umask() -> int:
+    # Only readable by replacing it, done once.
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+@contextmanager
+def atomic_write(path: "Union[str, Path]") -> "Iterator[BinaryIO]":
+    """Write a file aside and move it in place, readers never see it partial.
+
+    The file gets the permissions of any new file, instead of the owner only ones
+    of temporary files, so other users can read it.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            if hasattr(os, "fchmod"):
+                os.fchmod(f.fileno(), 0o666 & ~_umask())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
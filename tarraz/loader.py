@@ -0,0 +1,183 @@
+import math
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from tarraz.logger import logger
+from tarraz.models import ImageSize
+
+if TYPE_CHECKING:
+    from PIL.Image import Image as ImageType
+
+Band = Tuple[int, int]
+
+# Modes Image.reduce can average, others are converted to RGB first.
+REDUCIBLE_MODES = ("L", "LA", "La", "RGB", "RGBA", "RGBa", "RGBX", "CMYK", "I", "F")
+
+
+def open_image(image_path: str, width: "Optional[int]" = None) -> "ImageType":
+    """Open an image, decoding no more of it than needed to be `width` wide.
+
+    JPEG images are decoded at a reduced scale, other images are reduced by
+    the biggest integer factor keeping them at least `width` wide.
+    """
+    image = Image.open(image_path)
+    if not width or width >= image.width:
+        return image
+
+    size = ImageSize(width, math.ceil(image.height * width / image.width))
+    factor = min(image.width // size.width, image.height // size.height)
+    if factor < 2:
+        return image
+
+    if image.format == "JPEG":
+        image.draft(image.mode, size)
+        logger.debug("Decoding JPEG image at [%dx%d]...", *image.size)
+        return image
+
+    if image.mode not in REDUCIBLE_MODES:
+        image = image.convert("RGB")
+
+    logger.debug("Reducing image by %d...", factor)
+    return image.reduce(factor)
+
+
+def _raw_args(args: "Union[str, tuple]") -> "Tuple[str, int, int]":
+    """Raw decoder (rawmode, stride, ystep) arguments."""
+    if isinstance(args, str):
+        return args, 0, 1
+
+    rawmode, stride, ystep = (tuple(args) + (0, 1))[:3]
+    return rawmode, stride, ystep
+
+
+def _retile(tile: tuple, extents: tuple, offset: int) -> tuple:
+    if hasattr(tile, "_replace"):
+        return tile._replace(extents=extents, offset=offset)
+
+    return tile[0], extents, offset, tile[3]
+
+
+class StripReader(object):
+    """Read horizontal strips of an image, decoding as little of it as possible.
+
+    Images stored as raw rows (uncompressed TIFF, BMP, PPM...) or split in
+    several tiles are decoded strip by strip, others are decoded once in their
+    own mode, no more than `width` wide, and converted to RGB a strip at a time.
+
+    Strips are decoded by rewriting the image tiles and size, Pillow internals
+    which may change, the image is then decoded once as well.
+    """
+
+    def __init__(self, image_path: str, width: "Optional[int]" = None) -> None:
+        self._image_path = image_path
+        self._image: "Optional[ImageType]" = None
+        self._width = width
+
+        with Image.open(image_path) as image:
+            self.size = ImageSize(*image.size)
+            self.mode = image.mode
+            self._tiles = list(image.tile)
+
+        self._stride = self._get_stride()
+        self.streamable = self._stride is not None or self._is_banded()
+
+        if not self.streamable:
+            logger.warning(
+                "%s can't be decoded in strips, it's decoded whole instead.",
+                image_path,
+            )
+            self._image = open_image(image_path, width)
+            self.size = ImageSize(*self._image.size)
+
+    def _get_stride(self) -> "Optional[int]":
+        """Bytes per row of a single raw tile image, None for any other layout."""
+        if len(self._tiles) != 1 or self._tiles[0][0] != "raw":
+            return None
+
+        rawmode, stride, _ = _raw_args(self._tiles[0][3])
+        if stride:
+            return stride
+
+        row = Image.new(self.mode, (self.size.width, 1))
+        try:
+            return len(row.tobytes("raw", rawmode))
+        except (ValueError, OSError):
+            return None
+
+    def _is_banded(self) -> bool:
+        return len(self._tiles) > 1
+
+    def _bands(self, top: int, bottom: int) -> "Band":
+        """Smallest rows range made of whole tiles covering the given rows."""
+        if self._stride is not None:
+            return top, bottom
+
+        for _, (_, y0, _, y1), _, _ in self._tiles:
+            if y0 < bottom and y1 > top:
+                top, bottom = min(top, y0), max(bottom, y1)
+
+        return top, bottom
+
+    def _read_tiles(self, top: int, bottom: int) -> "ImageType":
+        # Opened from a file object so only the needed bytes are read, a path
+        # would let Pillow memory map the whole file.
+        image = Image.open(open(self._image_path, "rb"))
+
+        tiles: "List[tuple]" = []
+        if self._stride is not None:
+            # Rows are stored one after the other, skip to the first one needed.
+            tile = self._tiles[0]
+            _, _, ystep = _raw_args(tile[3])
+            row = top if ystep > 0 else self.size.height - bottom
+            extents = (0, 0, self.size.width, bottom - top)
+            tiles.append(_retile(tile, extents, tile[2] + row * self._stride))
+        else:
+            for tile in self._tiles:
+                x0, y0, x1, y1 = tile[1]
+                if y0 < bottom and y1 > top:
+                    extents = (x0, y0 - top, x1, y1 - top)
+                    tiles.append(_retile(tile, extents, tile[2]))
+
+        image.tile = tiles
+        image._size = (self.size.width, bottom - top)
+        if hasattr(image, "_tile_size"):
+            # TIFF allocates its decoding buffer from the tiles size.
+            image._tile_size = image._size
+
+        with image.fp:
+            image.load()
+
+        if image.size != (self.size.width, bottom - top):
+            raise ValueError(f"Decoded a [{image.width}x{image.height}] strip.")
+
+        return image
+
+    def read(self, top: int, bottom: int) -> "ImageType":
+        """RGB strip of the image rows from `top` up to `bottom`."""
+        if not self.streamable:
+            strip = self._image.crop((0, top, self.size.width, bottom))
+            return strip.convert("RGB")
+
+        band_top, band_bottom = self._bands(top, bottom)
+        try:
+            strip = self._read_tiles(band_top, band_bottom)
+        except (AttributeError, TypeError, ValueError, OSError) as e:
+            logger.warning(
+                "Failed to decode %s in strips, decoding it whole instead: %s",
+                self._image_path,
+                e,
+            )
+            self.streamable = False
+            self._image = Image.open(self._image_path)
+            return self.read(top, bottom)
+
+        if (band_top, band_bottom) != (top, bottom):
+            strip = strip.crop((0, top - band_top, self.size.width, bottom - band_top))
+
+        return strip.convert("RGB")
+
+    def close(self) -> None:
+        if self._image is not None:
+            self._image.close()
+            self._image = None
@@ -1,42 +1,71 @@
 import argparse
-import importlib.metadata
+import functools
 import logging
 import os
+from typing import TYPE_CHECKING, Dict
 
 from tarraz import constants
 from tarraz.logger import logger
-from tarraz.processor import Tarraz
-from tarraz.providers import DMCProvider
-from tarraz.stitcher import DisplayStitcher, SVGStitcher
-from tarraz.utils import color_choices, file_choices, parser
+from tarraz.utils import (
+    color_choices,
+    expand_images,
+    file_choices,
+    output_names,
+    palette_choices,
+    parser,
+)
 
-VERSION = importlib.metadata.version("tarraz")
+if TYPE_CHECKING:
+    from tarraz.models import Variant
+
+
+@functools.lru_cache(maxsize=None)
+def get_version() -> str:
+    # Reading the package metadata is slow, only done when asked for.
+    import importlib.metadata
+
+    return importlib.metadata.version("tarraz")
+
+
+class VersionAction(argparse.Action):
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, **kwargs) -> None:
+        kwargs.setdefault("help", "show program's version number and exit")
+        super().__init__(option_strings, dest=dest, nargs=0, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None) -> None:
+        parser.exit(message=f"{parser.prog} version {get_version()}\n")
 
 
 def init_argparse() -> argparse.ArgumentParser:
+    parser.add_argument("--version", action=VersionAction)
     parser.add_argument(
-        "--version",
-        action="version",
-        version=f"{parser.prog} version {VERSION}",
+        "images",
+        metavar="image",
+        nargs="+",
+        help="Input images, directories or glob patterns.",
     )
     parser.add_argument(
-        "image",
-        type=lambda f: file_choices(constants.IMAGE_EXTENSIONS, f),
-        help="Input image",
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of images processed in parallel, 0 to use all the CPUs.",
     )
     parser.add_argument(
         "-c",
         "--colors",
         type=int,
-        default=3,
-        help="Number of colors to use in the pattern.",
+        nargs="+",
+        default=[3],
+        help="Number of colors to use in the pattern, several values sweep them.",
     )
     parser.add_argument(
         "-n",
         "--stitches-count",
         type=int,
-        default=50,
-        help="Number of stitches to use in the x axis.",
+        nargs="+",
+        default=[50],
+        help="Number of stitches to use in the x axis, several values sweep them.",
     )
     parser.add_argument(
         "-w",
@@ -49,7 +78,22 @@ def init_argparse() -> argparse.ArgumentParser:
         "-m",
         "--dmc",
         type=lambda f: file_choices(constants.COLORS_EXTENSIONS, f),
-        help="DMC json color path.",
+        help="DMC json or compiled color path.",
+    )
+    parser.add_argument(
+        "-p",
+        "--provider",
+        default="dmc",
+        help="Name of the color provider, dmc or a palette registered by --palette.",
+    )
+    parser.add_argument(
+        "-P",
+        "--palette",
+        dest="palettes",
+        action="append",
+        default=[],
+        type=lambda f: palette_choices(constants.COLORS_EXTENSIONS, f),
+        help="Register a json or compiled palette as a provider, as name=path.",
     )
     parser.add_argument(
         "-t",
@@ -77,6 +121,81 @@ def init_argparse() -> argparse.ArgumentParser:
         action="store_true",
         help="Don't run cleanup job on generated image.",
     )
+    parser.add_argument(
+        "--cleanup-mode",
+        choices=constants.CLEANUP_MODES,
+        default="isolated",
+        help="Clean up isolated stitches or merge small same colored regions.",
+    )
+    parser.add_argument(
+        "--min-region-size",
+        type=int,
+        default=6,
+        help="Regions with less stitches are merged by the regions cleanup mode.",
+    )
+    parser.add_argument(
+        "--cleanup-passes",
+        type=int,
+        default=1,
+        help="Number of cleanup passes to run on generated image.",
+    )
+    parser.add_argument(
+        "--cleanup-radius",
+        type=int,
+        default=1,
+        help="Stitches around a stitch considered as its neighbours by the cleanup.",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=constants.ENGINES,
+        default="auto",
+        help="Color translation engine, numpy is used when available by default.",
+    )
+    parser.add_argument(
+        "-r",
+        "--reducer",
+        choices=constants.REDUCERS,
+        help="Resample the image straight to the stitches grid using this reducer.",
+    )
+    parser.add_argument(
+        "--full-decode",
+        action="store_true",
+        help="Decode the image at full resolution instead of the needed one.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Decode and reduce the image strip by strip to bound memory usage.",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        default=constants.MEMORY_BUDGET // (1024 * 1024),
+        help="Megabytes the streamed image strips may use.",
+    )
+    parser.add_argument(
+        "--metric",
+        choices=constants.METRICS,
+        default="rgb",
+        help="Color distance used to match the image colors to the DMC colors.",
+    )
+    parser.add_argument(
+        "--table-bits",
+        type=int,
+        choices=constants.TABLE_BITS_CHOICES,
+        help="Match colors through a persisted lookup table with these bits per "
+        "channel, 8 bits is exact.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory caching the generated patterns, disabled by default.",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=constants.CACHE_SIZE // (1024 * 1024),
+        help="Megabytes the patterns cache may use.",
+    )
     parser.add_argument(
         "--svg",
         action="store_true",
@@ -91,61 +210,145 @@ def init_argparse() -> argparse.ArgumentParser:
     return parser
 
 
-def main() -> None:
+def is_sweep(args: argparse.Namespace) -> bool:
+    return len(args.stitches_count) * len(args.colors) > 1
+
+
+def stitch(
+    image_path: str,
+    variant: "Variant",
+    args: argparse.Namespace,
+    names: "Dict[str, str]",
+) -> None:
+    from tarraz.stitcher import DisplayStitcher, SVGStitcher
+
+    save_to = f"{args.dist}/{names[image_path]}"
+
+    if is_sweep(args):
+        save_to = f"{save_to}/{variant.name}"
+
+    if args.svg:
+        SVGStitcher.stitch(
+            variant.pattern,
+            variant.colors,
+            variant.size,
+            transparent=args.transparent,
+            configs=constants.SVG_VARIANTS,
+            cell_size=args.cell_size,
+            save_to=save_to,
+        )
+    else:
+        DisplayStitcher.stitch(
+            variant.pattern,
+            variant.colors,
+            variant.size,
+            transparent=args.transparent,
+            cell_size=args.cell_size,
+            save_to=save_to,
+        )
+
+
+def main() -> int:
     p = init_argparse()
     args = p.parse_args()
 
     if args.verbose:
         logger.setLevel(logging.DEBUG)
 
-    base_file_name = os.path.basename(args.image).split(".")[0]
+    try:
+        images = expand_images(constants.IMAGE_EXTENSIONS, args.images)
+    except argparse.ArgumentTypeError as e:
+        p.error(str(e))
 
-    logger.info("Generating pattern for %s...", base_file_name)
-    logger.debug("\t File path: %s", args.image)
+    if not images:
+        p.error("No images found.")
+
+    logger.info("Generating patterns for %d images...", len(images))
+    logger.debug("\t File paths: %s", images)
+    logger.debug("\t Jobs: %s", args.jobs)
     logger.debug("\t X count: %s", args.stitches_count)
     logger.debug("\t Colors number: %s", args.colors)
     logger.debug("\t Result width: %s", args.width)
     logger.debug("\t DMC path: %s", args.dmc)
+    logger.debug("\t Provider: %s", args.provider)
+    logger.debug("\t Palettes: %s", args.palettes)
     logger.debug("\t No cleanup: %s", args.no_cleanup)
+    logger.debug("\t Cleanup mode: %s", args.cleanup_mode)
+    logger.debug("\t Min region size: %s", args.min_region_size)
+    logger.debug("\t Cleanup passes: %s", args.cleanup_passes)
+    logger.debug("\t Cleanup radius: %s", args.cleanup_radius)
+    logger.debug("\t Engine: %s", args.engine)
+    logger.debug("\t Reducer: %s", args.reducer)
+    logger.debug("\t Full decode: %s", args.full_decode)
+    logger.debug("\t Streaming: %s", args.stream)
+    logger.debug("\t Memory budget: %sMB", args.memory_budget)
+    logger.debug("\t Metric: %s", args.metric)
+    logger.debug("\t Lookup table bits: %s", args.table_bits)
+    logger.debug("\t Cache directory: %s", args.cache_dir)
+    logger.debug("\t Cache size: %sMB", args.cache_size)
     logger.debug("\t SVG cell size: %s", args.cell_size)
     logger.debug("\t Destination: %s", args.dist)
 
     if args.transparent:
         logger.info("Transparent colors: %s", args.transparent)
 
-    provider = DMCProvider(data_path=args.dmc)
-    tarraz = Tarraz(
-        args.image,
-        provider=provider,
-        x_count=args.stitches_count,
-        colors_num=args.colors,
+    # Imported once the arguments are valid, so --help stays fast.
+    from tarraz.batch import process_batch
+    from tarraz.cache import PatternCache
+    from tarraz.providers import provider_names, register_provider
+
+    for name, path in args.palettes:
+        register_provider(name, data_path=path)
+
+    if args.provider.lower() not in provider_names():
+        p.error(
+            f"Unknown color provider '{args.provider}'. "
+            f"Available providers are: {provider_names()}."
+        )
+
+    cache = None
+    if args.cache_dir:
+        cache = PatternCache(args.cache_dir, max_size=args.cache_size * 1024 * 1024)
+
+    results = process_batch(
+        images,
+        jobs=args.jobs or os.cpu_count(),
+        data_path=args.dmc,
+        provider=args.provider,
+        table_bits=args.table_bits,
+        metric=args.metric,
+        callback=functools.partial(stitch, args=args, names=output_names(images)),
+        sweep=(args.stitches_count, args.colors) if is_sweep(args) else None,
+        x_count=args.stitches_count[0],
+        colors_num=args.colors[0],
         result_width=args.width,
         cleanup=not args.no_cleanup,
+        cleanup_mode=args.cleanup_mode,
+        min_region_size=args.min_region_size,
+        cleanup_passes=args.cleanup_passes,
+        cleanup_radius=args.cleanup_radius,
+        engine=args.engine,
+        reducer=args.reducer,
+        full_decode=args.full_decode,
+        streaming=args.stream,
+        memory_budget=args.memory_budget * 1024 * 1024,
+        cache=cache,
     )
 
-    pattern, colors = tarraz.process()
+    failures = 0
+    for result in results:
+        if result.ok:
+            logger.info("%s: done.", result.image_path)
+        else:
+            logger.error("%s: %s", result.image_path, result.error)
+            failures += 1
 
-    if args.svg:
-        SVGStitcher.stitch(
-            pattern,
-            colors,
-            tarraz.size,
-            transparent=args.transparent,
-            configs=constants.SVG_VARIANTS,
-            cell_size=args.cell_size,
-            save_to=f"{args.dist}/{base_file_name}",
-        )
-    else:
-        DisplayStitcher.stitch(
-            pattern,
-            colors,
-            tarraz.size,
-            transparent=args.transparent,
-            cell_size=args.cell_size,
-            save_to=f"{args.dist}/{base_file_name}",
-        )
+    if failures:
+        logger.error("%d of %d images failed.", failures, len(images))
+        return 1
 
     logger.info("Tarraz process finished successfully!")
+    return 0
 
 
 if __name__ == "__main__":
@@ -1,4 +1,21 @@
-from typing import List, Literal, NamedTuple, TypeVar, Optional
+import hashlib
+from array import array
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    TypeVar,
+)
+
+from tarraz.compat import numpy, require_numpy
+
+if TYPE_CHECKING:
+    from PIL.Image import Image as ImageType
 
 
 class RGB(NamedTuple):
@@ -19,21 +36,12 @@ class RGB(NamedTuple):
 
 
 class Color(object):
-    _glyphs_count = 0
+    __slots__ = ("code", "rgb", "name")
 
     def __init__(self, code: str, rgb: RGB, name: str) -> None:
         self.code = code
         self.rgb = rgb
         self.name = name
-        self._glyph: "Optional[int]" = None
-
-    @property
-    def glyph(self):
-        return self._glyph
-
-    def assign_glyph(self, number: "Optional[int]" = None):
-        self._glyph = number if number else Color._glyphs_count + 1
-        Color._glyphs_count += 1
 
     def __str__(self) -> str:
         return self.name
@@ -43,27 +51,31 @@ class Color(object):
         cls, raw_colors: "List[dict]", extras: "Optional[List[RGB, RGB]]" = None
     ) -> List["Color"]:
         result = []
+        # Colors are deduplicated on their packed 0xRRGGBB value.
         processed = set()
         for raw_color in raw_colors:
-            rgb = RGB(*raw_color["rgb"])
-            if str(rgb) in processed:
+            red, green, blue = raw_color["rgb"]
+            key = red << 16 | green << 8 | blue
+            if key in processed:
                 continue
 
-            processed.add(str(rgb))
+            processed.add(key)
             result.append(
                 cls(
                     code=raw_color["code"],
-                    rgb=RGB(*raw_color["rgb"]),
+                    rgb=RGB(red, green, blue),
                     name=raw_color["name"],
                 )
             )
 
         extras = extras or []
         for i, extra in enumerate(extras):
-            if str(extra) in processed:
+            red, green, blue = extra
+            key = red << 16 | green << 8 | blue
+            if key in processed:
                 continue
 
-            processed.add(str(extra))
+            processed.add(key)
             result.append(
                 cls(
                     code=f"{i}",
@@ -75,6 +87,81 @@ class Color(object):
         return result
 
 
+class ColorStore(object):
+    """Palette colors kept in contiguous arrays for bulk access and searches.
+
+    `rgb` holds the channels of every color one after the other, `keys` their
+    packed 0xRRGGBB values, `codes` and `names` their labels. Positions are also
+    indexed by packed value and by code, the first color wins when several share
+    one.
+
+    The `Color` objects are kept along, at the same positions: they are what
+    providers hand out, built before any store and pickled with patterns, and
+    matches are told apart by their identity. Only the channels and packed values
+    are copied, the labels are the same strings, a few bytes per color.
+    """
+
+    def __init__(self, colors: "List[Color]") -> None:
+        self.colors = colors
+        self.rgb = array("B")
+        self.keys = array("L")
+        self.codes: "List[str]" = []
+        self.names: "List[str]" = []
+        self._by_key: "Dict[int, int]" = {}
+        self._by_code: "Dict[str, int]" = {}
+
+        for position, color in enumerate(colors):
+            red, green, blue = color.rgb
+            key = red << 16 | green << 8 | blue
+            self.rgb.extend((red, green, blue))
+            self.keys.append(key)
+            self.codes.append(color.code)
+            self.names.append(color.name)
+            self._by_key.setdefault(key, position)
+            self._by_code.setdefault(color.code, position)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __getitem__(self, index: int) -> "Color":
+        return self.colors[index]
+
+    @property
+    def rgb_colors(self) -> "List[RGB]":
+        rgb = self.rgb
+        return [RGB(*rgb[i : i + 3]) for i in range(0, len(rgb), 3)]
+
+    def index(self, rgb: "RGB") -> int:
+        """Position of the color, -1 when missing."""
+        red, green, blue = rgb
+        return self._by_key.get(red << 16 | green << 8 | blue, -1)
+
+    def index_of_code(self, code: str) -> int:
+        """Position of the color with the given code, -1 when missing."""
+        return self._by_code.get(code, -1)
+
+    def indices(self, colors: "Iterable[RGB]") -> "List[int]":
+        """Positions of many colors, -1 for the missing ones."""
+        by_key = self._by_key
+        return [
+            by_key.get(red << 16 | green << 8 | blue, -1) for red, green, blue in colors
+        ]
+
+    def digest(self) -> bytes:
+        """SHA-1 digest of the colors codes, names and channels."""
+        digest = hashlib.sha1()
+        for code, name in zip(self.codes, self.names):
+            digest.update(f"{code}\0{name}\0".encode("utf-8"))
+        digest.update(self.rgb)
+
+        return digest.digest()
+
+    def numpy(self):
+        """(colors, 3) uint8 array view of the colors channels."""
+        require_numpy("The numpy palette view")
+        return numpy.frombuffer(self.rgb, dtype=numpy.uint8).reshape(-1, 3)
+
+
 class Coordinate(NamedTuple):
     x: int
     y: int
@@ -91,10 +178,114 @@ Palette = List["Color"]
 ImageRow = List[T]
 
 RGBImageRow = ImageRow[RGB]
-PaletteImageRow = ImageRow[int]
+PaletteImageRow = memoryview
 
 RGBImage = List[RGBImageRow]
-PaletteImage = List[ImageRow[int]]
+
+
+class PaletteImage(object):
+    """Palette indices of a pattern, stored row after row in one contiguous buffer.
+
+    Rows are writable memoryviews, so `pattern[y][x]` reads and writes the buffer.
+    """
+
+    def __init__(self, width: int, height: int, data: "Optional[array]" = None):
+        if data is None:
+            data = array("B", [0]) * (width * height)
+
+        if len(data) != width * height:
+            raise ValueError(
+                f"Expected {width * height} palette indices, got {len(data)}."
+            )
+
+        self.width = width
+        self.height = height
+        self._data = data
+        self._view = memoryview(data)
+
+    @classmethod
+    def from_image(cls, image: "ImageType") -> "PaletteImage":
+        """Copy the indices of a palette ("P" mode) image in one shot."""
+        if image.mode != "P":
+            raise ValueError(f"Expected a palette image, got '{image.mode}' mode.")
+
+        width, height = image.size
+        return cls(width, height, array("B", image.tobytes()))
+
+    @classmethod
+    def from_rows(cls, rows: "List[List[int]]") -> "PaletteImage":
+        height = len(rows)
+        width = len(rows[0]) if height else 0
+
+        values = [value for row in rows for value in row]
+        typecode = "B" if max(values, default=0) < 256 else "H"
+
+        return cls(width, height, array(typecode, values))
+
+    @property
+    def size(self) -> "ImageSize":
+        return ImageSize(self.width, self.height)
+
+    @property
+    def data(self) -> "array":
+        return self._data
+
+    @property
+    def nbytes(self) -> int:
+        return self._view.nbytes
+
+    def numpy(self):
+        """A (height, width) numpy view sharing the pattern buffer."""
+        require_numpy("PaletteImage.numpy")
+        return numpy.frombuffer(self._data, dtype=self._data.typecode).reshape(
+            self.height, self.width
+        )
+
+    def tolist(self) -> "List[List[int]]":
+        return [row.tolist() for row in self]
+
+    def __getitem__(self, y: int) -> "PaletteImageRow":
+        if y < 0:
+            y += self.height
+        if not 0 <= y < self.height:
+            raise IndexError("pattern row index out of range")
+
+        start = y * self.width
+        return self._view[start : start + self.width]
+
+    def __iter__(self) -> "Iterator[PaletteImageRow]":
+        for start in range(0, self.width * self.height, self.width or 1):
+            yield self._view[start : start + self.width]
+
+    def __len__(self) -> int:
+        return self.height
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PaletteImage):
+            return NotImplemented
+
+        return self.size == other.size and self._view == other._view
+
+    def __getstate__(self) -> dict:
+        return {"width": self.width, "height": self.height, "data": self._data}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["width"], state["height"], state["data"])
+
+    def __repr__(self) -> str:
+        return f"PaletteImage<{self.width}x{self.height}>"
+
+
+class Variant(NamedTuple):
+    x_count: int
+    colors_num: int
+    pattern: "PaletteImage"
+    colors: "Palette"
+    size: "ImageSize"
+
+    @property
+    def name(self) -> str:
+        return f"{self.x_count}x{self.colors_num}"
+
 
 StrokeType = Literal["stroke:rgb(20,20,20);stroke-width:1;", "stroke:none;"]
-SVGAttributes = tuple[str, str, StrokeType]
@@ -1,20 +1,19 @@
-from typing import TYPE_CHECKING, List, Union
+import copy
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
 
 from PIL import Image
 
+from tarraz import constants
 from tarraz.logger import logger
-from tarraz.models import RGB, Color, Coordinate, ImageSize
-from tarraz.providers import DMCProvider
-from tarraz.utils import generate_image, get_neighbours, index_of
+from tarraz.models import Color, ImageSize, PaletteImage, Variant
+from tarraz.providers import default_provider
 
 if TYPE_CHECKING:
-    from tarraz.models import (
-        Palette,
-        PaletteImage,
-        PaletteImageRow,
-        RGBImage,
-        RGBImageRow,
-    )
+    from PIL.Image import Image as ImageType
+
+    from tarraz.cache import PatternCache
+    from tarraz.engines import Translation
+    from tarraz.models import Palette
     from tarraz.providers import ColorProvider
 
 
@@ -22,35 +21,217 @@ class Tarraz(object):
     def __init__(
         self,
         image_path: str,
-        provider: "ColorProvider" = DMCProvider(),
+        provider: "Optional[ColorProvider]" = None,
         cleanup: bool = True,
         colors_num: int = 3,
         result_width: int = 1000,
         x_count: int = 50,
+        engine: "Optional[str]" = None,
+        reducer: "Optional[str]" = None,
+        cleanup_passes: int = 1,
+        cleanup_radius: int = 1,
+        cleanup_mode: str = "isolated",
+        min_region_size: int = 6,
+        streaming: bool = False,
+        memory_budget: int = constants.MEMORY_BUDGET,
+        full_decode: bool = False,
+        cache: "Optional[PatternCache]" = None,
     ) -> None:
+        # The processing stages are imported when used, importing tarraz stays fast.
+        from tarraz.engines import get_engine
+
         self.new_width = result_width
 
+        self._cache = cache
         self._cleanup = cleanup
+        self._cleanup_mode = cleanup_mode
+        self._cleanup_passes = cleanup_passes
+        self._cleanup_radius = cleanup_radius
         self._colors_num = colors_num
-        self._image = Image.open(image_path).convert("RGB")
-        self._provider = provider
+        self._engine = get_engine(engine)
+        self._full_decode = full_decode
+        self._min_region_size = min_region_size
+        self._image_path = image_path
+        self._memory_budget = memory_budget
+        self._provider = provider if provider is not None else default_provider()
+        self._reducer = reducer
+        self._streaming = streaming
         self._x_count = x_count
 
+        # Decoded on first use, cached patterns don't need the image at all.
+        self._image: "Optional[ImageType]" = None
+        self._source: "Optional[ImageType]" = None
+        self._size: "Optional[ImageSize]" = None
+
+    @property
+    def x_count(self) -> int:
+        return self._x_count
+
+    @property
+    def colors_num(self) -> int:
+        return self._colors_num
+
     @property
     def pixel_size(self) -> int:
         return self.new_width // int(self._x_count)
 
+    @property
+    def _step(self) -> int:
+        """Pixels between two stitches of the sampled image."""
+        return 1 if self._reducer else self.pixel_size
+
+    @property
+    def _decode_width(self) -> "Optional[int]":
+        return self._get_decode_width(self._x_count)
+
+    def _get_decode_width(self, x_count: int) -> "Optional[int]":
+        """Smallest source width giving the same level of detail."""
+        if self._full_decode:
+            return None
+
+        if self._reducer or self._streaming:
+            return x_count * constants.DECODE_OVERSAMPLING
+
+        return self.new_width
+
     @property
     def size(self) -> "ImageSize":
+        if self._image is None:
+            if self._streaming and self._size is None:
+                # Only the header is read, the image is decoded strip by strip.
+                with Image.open(self._image_path) as image:
+                    self._size = ImageSize(*image.size)
+
+            return self._size or ImageSize(*self._load_image().size)
+
         return ImageSize(*self._image.size)
 
+    def _load_image(self) -> "ImageType":
+        from tarraz.loader import open_image
+
+        if self._source is None:
+            self._source = open_image(self._image_path, self._decode_width)
+            self._source = self._source.convert("RGB")
+
+        self._image = self._source
+        return self._image
+
+    def _cache_key(self, decode_width: "Optional[int]") -> str:
+        """Cache key of the pattern, from every option changing its content."""
+        options = {
+            "x_count": self._x_count,
+            "colors_num": self._colors_num,
+            "result_width": self.new_width,
+            "reducer": self._reducer,
+            "streaming": self._streaming,
+            "decode_width": decode_width,
+            "cleanup": self._cleanup,
+            "cleanup_mode": self._cleanup_mode,
+            "cleanup_passes": self._cleanup_passes,
+            "cleanup_radius": self._cleanup_radius,
+            "min_region_size": self._min_region_size,
+            "index": str(self._provider.color_index),
+        }
+
+        return self._cache.key(self._image_path, self._provider, options)
+
+    def _get_cached(
+        self, key: "Optional[str]"
+    ) -> "Optional[tuple[PaletteImage, Palette]]":
+        cached = self._cache.get(key, self._provider) if key else None
+        if cached:
+            self._image = None
+            self._size = cached[0].size
+
+        return cached
+
     def process(self) -> tuple["PaletteImage", List[Color]]:
         """Create a resized image with the translated colors."""
         logger.info("Processing image started...")
 
-        self._resize_image()
-        translated_image = self._translate_image()
-        colored_image = generate_image(translated_image)
+        key = self._cache_key(self._decode_width) if self._cache else None
+        cached = self._get_cached(key)
+        if cached:
+            return cached
+
+        if self._streaming:
+            translation = self._stream_image()
+        else:
+            self._load_image()
+            self._sample_image()
+            translation = self._translate_image(self._step)
+
+        pattern, colors = self._generate(translation)
+        if key:
+            self._cache.put(key, pattern, colors)
+
+        return pattern, colors
+
+    def sweep(
+        self, x_counts: "List[int]", colors_nums: "List[int]"
+    ) -> "Iterator[Variant]":
+        """Process the image for every stitches count and colors number combination.
+
+        The image is decoded once, sampled once per stitches count and translated
+        once per grid, only the quantization and cleanup run for every variant.
+        Cached variants are loaded as is, the image is only decoded when needed.
+        """
+        from tarraz.loader import open_image
+
+        if self._streaming:
+            raise ValueError("The streaming mode doesn't support sweeps.")
+
+        logger.info(
+            "Sweeping image over %d variants...", len(x_counts) * len(colors_nums)
+        )
+
+        source: "Optional[ImageType]" = None
+        width = max((self._get_decode_width(x) or 0) for x in x_counts) or None
+
+        samples: "Dict[Optional[int], ImageType]" = {}
+        translations: "Dict[Tuple[Optional[int], int], Translation]" = {}
+        for x_count in x_counts:
+            variant = copy.copy(self)
+            variant._x_count = x_count
+
+            # Resizing doesn't depend on the stitches count, only resampling does.
+            sample_key = x_count if self._reducer else None
+            translation_key = (sample_key, variant._step)
+
+            for colors_num in colors_nums:
+                variant._colors_num = colors_num
+
+                key = variant._cache_key(width) if self._cache else None
+                cached = variant._get_cached(key)
+                if cached:
+                    yield Variant(x_count, colors_num, *cached, variant.size)
+                    continue
+
+                if translation_key not in translations:
+                    if sample_key not in samples:
+                        if source is None:
+                            source = open_image(self._image_path, width)
+                            source = source.convert("RGB")
+                        variant._image = source
+                        variant._sample_image()
+                        samples[sample_key] = variant._image
+
+                    variant._image = samples[sample_key]
+                    translations[translation_key] = variant._translate_image(
+                        variant._step
+                    )
+
+                pattern, colors = variant._generate(translations[translation_key])
+                if key:
+                    self._cache.put(key, pattern, colors)
+
+                yield Variant(x_count, colors_num, pattern, colors, variant.size)
+
+    def _generate(
+        self, translation: "Translation"
+    ) -> tuple["PaletteImage", List[Color]]:
+        """Quantize and clean up the translated image into a pattern."""
+        colored_image = self._engine.to_image(translation)
 
         # Translate pixels through the palette using the required number of colors.
         self._image = colored_image.convert(
@@ -67,15 +248,14 @@ class Tarraz(object):
 
         return pattern, colors
 
-    def _get_pixel(self, x: int, y: int, palette=False) -> Union[int, "RGB"]:
-        coordinate = Coordinate(x, y)
-        pixel_data = self._image.getpixel(coordinate)
-
-        if palette:
-            return pixel_data
+    def _sample_image(self) -> None:
+        """Prepare the image for translation."""
+        if self._reducer:
+            from tarraz.resample import resample
 
-        # Ignore alpha value incase we have a png
-        return RGB(*pixel_data[:3])
+            self._image = resample(self._image, self._x_count, self._reducer)
+        else:
+            self._resize_image()
 
     def _resize_image(self):
         scale = self.new_width / self.size.width
@@ -84,60 +264,67 @@ class Tarraz(object):
 
         self._image = self._image.resize(new_size, Image.NEAREST)
 
-    def _translate_image(self) -> "RGBImage":
+    def _translate_image(self, step: int = 1) -> "Translation":
         """Convert image pixels colors to match the provider colors."""
-        logger.info(f"Translating image colors to {self._provider}...")
+        logger.info(
+            f"Translating image colors to {self._provider} using {self._engine}..."
+        )
 
-        colors: "RGBImage" = []
-        for y in range(0, self.size.height, self.pixel_size):
-            row: "RGBImageRow" = []
-            for x in range(0, self.size.width, self.pixel_size):
-                pixel = self._get_pixel(x, y)
-                matching_color = self._provider.get_matching_color(pixel)
-                row.append(matching_color.rgb)
-            colors.append(row)
+        return self._engine.translate(self._image, self._provider, step)
 
-        return colors
+    def _stream_image(self) -> "Translation":
+        """Resample and translate the image colors strip by strip."""
+        logger.info(
+            f"Streaming image colors to {self._provider} using {self._engine}..."
+        )
+
+        from tarraz.loader import StripReader
+        from tarraz.resample import resample_strips
+
+        reader = StripReader(self._image_path, self._decode_width)
+        strips = resample_strips(
+            reader, self._x_count, self._reducer or "box", self._memory_budget
+        )
+
+        try:
+            return self._engine.join(
+                [self._engine.translate(strip, self._provider) for strip in strips]
+            )
+        finally:
+            reader.close()
 
     def _create_pattern(self) -> "PaletteImage":
         """Create an image with the information from the new image."""
         logger.info("Generating SVG information...")
-        pattern: "PaletteImage" = []
-
-        for y in range(self.size.height):
-            row: "PaletteImageRow" = []
-            for x in range(self.size.width):
-                color_index = self._get_pixel(x, y, palette=True)
-                row.append(color_index)
-            pattern.append(row)
 
-        return pattern
+        return PaletteImage.from_image(self._image)
 
     def _generate_palette(self) -> "Palette":
         """Creates a new palette with the dmc objects"""
         logger.info("Generating SVG palette...")
         image_palette = self._image.getpalette()
 
-        palette = []
-        for i in range(self._colors_num):
-            r = i * 3
-            red, green, blue = image_palette[r : r + 3]
-
-            color = RGB(red, green, blue)
-            matching_color = self._provider.get_matching_color(color)
-            palette.append(matching_color)
+        # The image may have less colors than requested.
+        colors_count = min(self._colors_num, len(image_palette) // 3)
+        indices, colors = self._provider.get_matching_colors(
+            bytes(image_palette[: colors_count * 3])
+        )
 
-        return palette
+        return [colors[i] for i in indices]
 
     def _clean_up(self, pattern: "PaletteImage") -> None:
         """Perform extra jobs like cleaning the image  removing isolated pixels."""
-        logger.info("Cleaning up proces started...")
+        from tarraz.cleanup import merge_regions, remove_isolated
 
-        for x in range(self.size.width):
-            for y in range(self.size.height):
-                coordinate = Coordinate(y, x)
-                neighbours = get_neighbours(coordinate, pattern)
+        logger.info("Cleaning up proces started...")
 
-                if index_of(neighbours, pattern[y][x]) == -1:
-                    mode = max(neighbours, key=neighbours.count)
-                    pattern[y][x] = mode
+        if self._cleanup_mode == "regions":
+            merge_regions(
+                pattern,
+                min_region_size=self._min_region_size,
+                passes=self._cleanup_passes,
+            )
+        else:
+            remove_isolated(
+                pattern, radius=self._cleanup_radius, passes=self._cleanup_passes
+            )
@@ -1,4 +1,32 @@
+from .cache import CacheStats, MatchCache
+from .index import ColorIndex, GridIndex, KDTreeIndex, get_index
+from .table import ColorTable
 from .provider import ColorProvider
-from .dmc import DMCProvider
+from .dmc import DMCProvider, default_provider
+from .registry import (
+    PaletteProvider,
+    get_provider,
+    provider_factory,
+    provider_names,
+    register_provider,
+)
+from .shared import SharedPalette
 
-__all__ = ("ColorProvider", "DMCProvider")
+__all__ = (
+    "CacheStats",
+    "ColorIndex",
+    "ColorProvider",
+    "ColorTable",
+    "DMCProvider",
+    "GridIndex",
+    "KDTreeIndex",
+    "MatchCache",
+    "PaletteProvider",
+    "SharedPalette",
+    "default_provider",
+    "get_index",
+    "get_provider",
+    "provider_factory",
+    "provider_names",
+    "register_provider",
+)
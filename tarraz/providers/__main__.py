@@ -0,0 +1,31 @@
+import argparse
+from typing import List, Optional
+
+from tarraz import constants
+from tarraz.providers.compiled import compile_palette
+
+
+def main(argv: "Optional[List[str]]" = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m tarraz.providers",
+        description="Compile a JSON palette for faster loading.",
+    )
+    parser.add_argument("palette", help="JSON palette path.")
+    parser.add_argument("-o", "--output", help="Compiled palette path.")
+    parser.add_argument(
+        "--table-bits",
+        type=int,
+        choices=constants.TABLE_BITS_CHOICES,
+        help="Embed a lookup table of the palette, lower bits tables are only used "
+        "by providers asking for them.",
+    )
+    parser.add_argument("--metric", default="rgb", choices=constants.METRICS)
+    args = parser.parse_args(argv)
+
+    path = compile_palette(args.palette, args.output, args.table_bits, args.metric)
+    print(f"Compiled {path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,118 @@
+import sys
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Hashable, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from tarraz.models import Color
+
+# Rough bytes used by a cache slot on top of its key, for the bytes budget.
+ENTRY_OVERHEAD = 104
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class MatchCache(object):
+    """Least recently used cache of matching colors, bounded by entries or bytes.
+
+    Colors are stored under a single packed integer instead of their RGB tuple
+    unless `packed` is off. Lookups, misses and evictions are counted.
+    """
+
+    def __init__(
+        self,
+        max_entries: "Optional[int]" = None,
+        max_bytes: "Optional[int]" = None,
+        packed: bool = True,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.packed = packed
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: "OrderedDict[Hashable, Optional[Color]]" = OrderedDict()
+        self._bytes = 0
+
+    def _key(self, rgb) -> "Hashable":
+        if self.packed:
+            red, green, blue = rgb
+            return red << 16 | green << 8 | blue
+
+        return rgb
+
+    def get(self, rgb, default: "Any" = None) -> "Any":
+        key = self._key(rgb)
+
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __getitem__(self, rgb) -> "Optional[Color]":
+        key = self._key(rgb)
+        value = self._entries[key]
+
+        self._entries.move_to_end(key)
+        return value
+
+    def __setitem__(self, rgb, color: "Optional[Color]") -> None:
+        key = self._key(rgb)
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            self._bytes += sys.getsizeof(key) + ENTRY_OVERHEAD
+        self._entries[key] = color
+
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key, _ = self._entries.popitem(last=False)
+            self._bytes -= sys.getsizeof(key) + ENTRY_OVERHEAD
+            self.evictions += 1
+
+    def __contains__(self, rgb) -> bool:
+        return self._key(rgb) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """Estimated bytes used by the cached entries."""
+        return self._bytes
+
+    @property
+    def stats(self) -> "CacheStats":
+        return CacheStats(self.hits, self.misses, self.evictions, len(self))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def __repr__(self):
+        return (
+            f"MatchCache(size={len(self)}, hits={self.hits}, misses={self.misses}, "
+            f"evictions={self.evictions})"
+        )
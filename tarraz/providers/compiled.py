@@ -0,0 +1,178 @@
+import mmap
+import struct
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, List, NamedTuple, Optional, Union
+
+from tarraz import constants
+from tarraz.compat import HAS_NUMPY, numpy
+from tarraz.files import atomic_write
+from tarraz.logger import logger
+from tarraz.models import RGB, Color, ColorStore
+
+if TYPE_CHECKING:
+    from tarraz.providers.table import ColorTable
+
+# Magic, version, colors count, palette digest, labels size, embedded lookup
+# table bits (0 without one) and metric. Followed by the colors channels, their
+# codes and names as NUL separated UTF-8 strings, then the table, 8 bytes aligned.
+HEADER = struct.Struct("<4sBI20sIB16s")
+MAGIC = b"TRZC"
+VERSION = 2
+ALIGNMENT = 8
+
+
+class CompiledPalette(NamedTuple):
+    colors: "List[Color]"
+    digest: bytes
+    table: "Any"
+    table_bits: int
+    metric: str
+
+
+def _table_offset(count: int, labels_size: int) -> int:
+    offset = HEADER.size + count * 3 + labels_size
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def dump_palette(colors: "List[Color]", table: "Optional[ColorTable]" = None) -> bytes:
+    """Compact binary form of a palette, read back by `load_palette`.
+
+    The lookup table of the palette is embedded when given.
+    """
+    store = ColorStore(colors)
+    labels = "\0".join(store.codes + store.names).encode("utf-8")
+    table_bits, metric = (table.bits, table.metric) if table else (0, "rgb")
+
+    chunks = [
+        HEADER.pack(
+            MAGIC,
+            VERSION,
+            len(store),
+            store.digest(),
+            len(labels),
+            table_bits,
+            metric.encode("ascii"),
+        ),
+        store.rgb.tobytes(),
+        labels,
+    ]
+    if table is not None:
+        size = sum(map(len, chunks))
+        chunks.append(bytes(_table_offset(len(store), len(labels)) - size))
+        chunks.append(numpy.ascontiguousarray(table.table).tobytes())
+
+    return b"".join(chunks)
+
+
+def load_palette(data) -> "CompiledPalette":
+    """Read a palette dumped by `dump_palette` from a buffer.
+
+    The embedded lookup table is a read only view of the buffer, no copy.
+    """
+    magic, version, count, digest, labels_size, table_bits, metric = HEADER.unpack_from(
+        data
+    )
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Unsupported compiled palette format.")
+
+    offset = HEADER.size + count * 3
+    with memoryview(data) as view:
+        rgb = view[HEADER.size : offset].tolist()
+        labels = str(view[offset : offset + labels_size], "utf-8").split("\0")
+    codes, names = labels[:count], labels[count:]
+
+    colors = [
+        Color(code=codes[i], rgb=RGB(*rgb[i * 3 : i * 3 + 3]), name=names[i])
+        for i in range(count)
+    ]
+
+    table = None
+    if table_bits and not HAS_NUMPY:
+        logger.debug("Ignoring the embedded lookup table, numpy is missing.")
+        table_bits = 0
+    elif table_bits:
+        dtype = numpy.uint8 if count <= 256 else numpy.uint16
+        table = numpy.frombuffer(
+            data,
+            dtype=dtype,
+            count=1 << 3 * table_bits,
+            offset=_table_offset(count, labels_size),
+        )
+
+    return CompiledPalette(
+        colors, digest, table, table_bits, metric.rstrip(b"\0").decode("ascii")
+    )
+
+
+def read_palette(path: "Union[str, Path]") -> "CompiledPalette":
+    """Memory map a compiled palette, only the embedded table keeps the map open."""
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    palette = load_palette(data)
+    if palette.table is None:
+        data.close()
+
+    return palette
+
+
+def write_palette(
+    path: "Union[str, Path]",
+    colors: "List[Color]",
+    table: "Optional[ColorTable]" = None,
+) -> None:
+    with atomic_write(path) as f:
+        f.write(dump_palette(colors, table))
+
+
+def compiled_path(data_path: "Union[str, Path]") -> "Optional[Path]":
+    """Compiled palette to read instead of the given one, if any.
+
+    That is the path itself for a compiled palette, or the compiled palette next
+    to a JSON one when it was written after it.
+    """
+    path = Path(data_path)
+    if path.suffix == constants.COMPILED_COLORS_EXTENSION:
+        return path
+
+    compiled = path.with_suffix(constants.COMPILED_COLORS_EXTENSION)
+    try:
+        if compiled.stat().st_mtime_ns > path.stat().st_mtime_ns:
+            return compiled
+    except OSError:
+        pass
+
+    return None
+
+
+def compile_palette(
+    data_path: "Union[str, Path]",
+    output: "Optional[Union[str, Path]]" = None,
+    table_bits: "Optional[int]" = None,
+    metric: str = "rgb",
+) -> "Path":
+    """Compile a JSON palette next to it, or to `output`.
+
+    Later providers given the JSON palette read the compiled one instead, as
+    long as it is newer. A lookup table is embedded with `table_bits`.
+    """
+    import json
+
+    from tarraz.providers.table import ColorTable
+
+    with open(data_path, mode="r") as data_file:
+        colors = Color.create(json.load(data_file))
+
+    table = None
+    if table_bits:
+        table = ColorTable(
+            ColorStore(colors).rgb_colors, bits=table_bits, metric=metric
+        )
+
+    path = Path(
+        output or Path(data_path).with_suffix(constants.COMPILED_COLORS_EXTENSION)
+    )
+    write_palette(path, colors, table)
+    logger.info("Compiled %d colors to %s.", len(colors), path)
+
+    return path
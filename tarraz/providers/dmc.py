@@ -1,8 +1,14 @@
-from typing import List, Optional
+import functools
+from typing import TYPE_CHECKING, List, Optional
 
-from tarraz.colors import DMC_COLORS
+from tarraz import colors as dmc
+from tarraz.logger import logger
 from tarraz.models import Color
 from tarraz.providers import ColorProvider
+from tarraz.providers.compiled import read_palette
+
+if TYPE_CHECKING:
+    from tarraz.providers import MatchCache
 
 
 class DMCProvider(ColorProvider):
@@ -10,8 +16,35 @@ class DMCProvider(ColorProvider):
         self,
         data_path: Optional[str] = None,
         colors: Optional[List["Color"]] = None,
+        table_bits: Optional[int] = None,
+        metric: str = "rgb",
+        match_cache: "Optional[MatchCache]" = None,
     ) -> None:
         if not data_path and not colors:
-            colors = Color.create(DMC_COLORS)
+            data_path = dmc.DMC_PALETTE
+
+        super().__init__(
+            data_path=data_path,
+            colors=colors,
+            table_bits=table_bits,
+            metric=metric,
+            match_cache=match_cache,
+        )
+
+    def _read_colors(self) -> "List[Color]":
+        if self._data_path != dmc.DMC_PALETTE:
+            return super()._read_colors()
+
+        try:
+            self._palette = read_palette(dmc.DMC_PALETTE)
+        except (OSError, ValueError) as e:
+            logger.debug("Falling back to the raw DMC colors: %s", e)
+            return Color.create(dmc.DMC_COLORS)
+
+        return self._palette.colors
+
 
-        super().__init__(data_path=data_path, colors=colors)
+@functools.lru_cache(maxsize=None)
+def default_provider() -> "DMCProvider":
+    """DMC provider shared by everything not given one, built on first use."""
+    return DMCProvider()
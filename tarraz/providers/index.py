@@ -0,0 +1,240 @@
+from abc import ABC
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from tarraz.compat import HAS_NUMPY, numpy, require_numpy
+
+if TYPE_CHECKING:
+    from tarraz.models import RGB
+
+# Palette entry as (palette index, red, green, blue).
+Entry = Tuple[int, int, int, int]
+# Best match so far as (squared distance, palette index).
+Match = Tuple[float, int]
+
+# Palette colors kept together in a k-d tree leaf.
+LEAF_SIZE = 8
+
+# Bits of every channel addressing a grid cell, 16x16x16 cells by default.
+CELL_BITS = 4
+
+# Number of colors compared against their candidates at once.
+CHUNK_SIZE = 4096
+
+# Candidates padding, farther from any color than every palette color.
+SENTINEL = 1024
+
+
+def _closest(entries: "List[Entry]", rgb: "RGB", best: "Match") -> "Match":
+    """Closest entry to the color or the given best match, lowest index on ties."""
+    red, green, blue = rgb
+    best_distance, best_index = best
+
+    for index, r, g, b in entries:
+        distance = (r - red) ** 2 + (g - green) ** 2 + (b - blue) ** 2
+        if distance < best_distance or (
+            distance == best_distance and index < best_index
+        ):
+            best_distance, best_index = distance, index
+
+    return best_distance, best_index
+
+
+class ColorIndex(ABC):
+    """Nearest palette color search.
+
+    Results match a linear scan by euclidean distance, the lowest palette index
+    wins on ties.
+    """
+
+    name = ""
+
+    def __init__(self, colors: "List[RGB]") -> None:
+        self._entries: "List[Entry]" = [(i, *color) for i, color in enumerate(colors)]
+
+    def nearest(self, rgb: "RGB") -> NotImplemented:
+        """Palette index of the nearest color, -1 for an empty palette."""
+        return NotImplemented
+
+    def nearest_many(self, colors) -> "List[int]":
+        """Palette index of the nearest color of every (red, green, blue) color."""
+        return [self.nearest(color) for color in colors]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __str__(self):
+        return f"Index<{self.name}>"
+
+
+class KDTreeIndex(ColorIndex):
+    """Pure python k-d tree, splits the palette on its widest channel."""
+
+    name = "kdtree"
+
+    def __init__(self, colors: "List[RGB]") -> None:
+        super().__init__(colors)
+        self._root = self._build(self._entries) if self._entries else None
+
+    def _build(self, entries: "List[Entry]") -> tuple:
+        if len(entries) <= LEAF_SIZE:
+            return -1, entries
+
+        spreads = [
+            max(entry[axis] for entry in entries)
+            - min(entry[axis] for entry in entries)
+            for axis in (1, 2, 3)
+        ]
+        axis = spreads.index(max(spreads)) + 1
+
+        entries = sorted(entries, key=lambda entry: entry[axis])
+        middle = len(entries) // 2
+        split = entries[middle][axis]
+
+        # Lower half colors are at most at the split, upper half ones at least.
+        return (
+            axis - 1,
+            split,
+            self._build(entries[:middle]),
+            self._build(entries[middle:]),
+        )
+
+    def nearest(self, rgb: "RGB") -> int:
+        best: "Match" = (float("inf"), -1)
+        stack = [(0, self._root)] if self._root else []
+
+        while stack:
+            bound, node = stack.pop()
+            # Equally far nodes may still hold a lower index.
+            if bound > best[0]:
+                continue
+
+            if node[0] < 0:
+                best = _closest(node[1], rgb, best)
+                continue
+
+            axis, split, lower, upper = node
+            diff = rgb[axis] - split
+            near, far = (lower, upper) if diff < 0 else (upper, lower)
+
+            stack.append((diff * diff, far))
+            stack.append((0, near))
+
+        return best[1]
+
+
+class GridIndex(ColorIndex):
+    """Uniform grid over the RGB cube, every cell keeps its candidate colors.
+
+    Candidates are the palette colors which can be the nearest one of any color
+    of the cell, so queries only compare a handful of them.
+    """
+
+    name = "grid"
+
+    def __init__(self, colors: "List[RGB]", bits: int = CELL_BITS) -> None:
+        require_numpy("The grid color index")
+        super().__init__(colors)
+
+        self._bits = bits
+        self._shift = 8 - bits
+        self._buckets: "Dict[int, List[Entry]]" = {}
+
+        palette = numpy.array(colors, dtype=numpy.int32).reshape(-1, 3)
+        self._candidates = self._build(palette)
+        self._palette = numpy.vstack(
+            (palette, numpy.full((1, 3), SENTINEL, dtype=numpy.int32))
+        )
+
+    def _build(self, palette):
+        cells = 1 << self._bits
+        lows = (numpy.arange(cells, dtype=numpy.int32) << self._shift)[:, None]
+        highs = lows + (1 << self._shift) - 1
+
+        # Squared distances on every axis between the cells and the palette.
+        near, far = [], []
+        for channel in palette.T:
+            near.append(
+                (numpy.maximum(lows - channel, 0) + numpy.maximum(channel - highs, 0))
+                ** 2
+            )
+            far.append(numpy.maximum(abs(channel - lows), abs(highs - channel)) ** 2)
+
+        # Built a red slice of cells at a time, big palettes stay within memory.
+        rows, columns = [], []
+        for red in range(cells):
+            closest = near[0][red] + (near[1][:, None] + near[2][None, :]).reshape(
+                cells**2, -1
+            )
+            farthest = far[0][red] + (far[1][:, None] + far[2][None, :]).reshape(
+                cells**2, -1
+            )
+
+            # A color farther than the farthest point of the closest color can't win.
+            slice_rows, slice_columns = numpy.nonzero(
+                closest <= farthest.min(axis=1)[:, None]
+            )
+            rows.append(slice_rows + red * cells**2)
+            columns.append(slice_columns)
+
+        rows, columns = numpy.concatenate(rows), numpy.concatenate(columns)
+        counts = numpy.bincount(rows, minlength=cells**3)
+        starts = numpy.cumsum(counts) - counts
+
+        table = numpy.full((cells**3, counts.max()), len(palette), dtype=numpy.intp)
+        table[rows, numpy.arange(len(rows)) - starts[rows]] = columns
+
+        return table
+
+    def _cell(self, red, green, blue):
+        shift, bits = self._shift, self._bits
+        return (red >> shift) << 2 * bits | (green >> shift) << bits | blue >> shift
+
+    def nearest(self, rgb: "RGB") -> int:
+        cell = self._cell(*rgb)
+
+        if cell not in self._buckets:
+            self._buckets[cell] = [
+                self._entries[i]
+                for i in self._candidates[cell].tolist()
+                if i < len(self)
+            ]
+
+        return _closest(self._buckets[cell], rgb, (float("inf"), -1))[1]
+
+    def nearest_many(self, colors):
+        colors = numpy.asarray(colors, dtype=numpy.int32).reshape(-1, 3)
+        result = numpy.empty(len(colors), dtype=numpy.intp)
+
+        for start in range(0, len(colors), CHUNK_SIZE):
+            chunk = colors[start : start + CHUNK_SIZE]
+            candidates = self._candidates[self._cell(*chunk.T)]
+
+            diff = self._palette[candidates] - chunk[:, None, :]
+            distances = numpy.einsum("ijk,ijk->ij", diff, diff)
+
+            # Candidates are sorted, the first nearest one has the lowest index.
+            best = distances.argmin(axis=1)
+            result[start : start + CHUNK_SIZE] = candidates[
+                numpy.arange(len(chunk)), best
+            ]
+
+        return result
+
+
+def get_index(
+    colors: "List[RGB]", name: "Optional[str]" = None, metric: str = "rgb"
+) -> "ColorIndex":
+    """Build the named index over the colors, the fastest available by default."""
+    if metric != "rgb":
+        from tarraz.providers.metrics import MetricIndex
+
+        return MetricIndex(colors, metric)
+
+    if not name:
+        name = "grid" if HAS_NUMPY and colors else "kdtree"
+
+    for index in ColorIndex.__subclasses__():
+        if index.name == name:
+            return index(colors)
+
+    raise ValueError(f"Unknown color index '{name}'.")
@@ -0,0 +1,136 @@
+from typing import TYPE_CHECKING, List
+
+from tarraz.compat import numpy, require_numpy
+from tarraz.providers.index import ColorIndex
+
+if TYPE_CHECKING:
+    from tarraz.models import RGB
+
+# sRGB to CIE XYZ matrix and reference white, both for the D65 illuminant.
+XYZ_MATRIX = (
+    (0.4124564, 0.3575761, 0.1804375),
+    (0.2126729, 0.7151522, 0.0721750),
+    (0.0193339, 0.1191920, 0.9503041),
+)
+WHITE = (0.95047, 1.0, 1.08883)
+
+# Colors compared against the whole palette at once, ΔE2000 needs a lot of
+# temporary arrays.
+CHUNK_SIZE = 512
+
+
+def srgb_to_lab(colors):
+    """CIELAB coordinates of a (..., 3) array of sRGB colors."""
+    linear = numpy.asarray(colors, dtype=numpy.float64) / 255
+    linear = numpy.where(
+        linear <= 0.04045, linear / 12.92, ((linear + 0.055) / 1.055) ** 2.4
+    )
+
+    xyz = linear @ numpy.array(XYZ_MATRIX).T / numpy.array(WHITE)
+    f = numpy.where(
+        xyz > (6 / 29) ** 3, numpy.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29
+    )
+    fx, fy, fz = f[..., 0], f[..., 1], f[..., 2]
+
+    return numpy.stack((116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)), axis=-1)
+
+
+def delta_e_cie76(lab, palette):
+    """Squared CIE76 ΔE between every color and every palette color."""
+    diff = lab[:, None, :] - palette[None, :, :]
+    return numpy.einsum("ijk,ijk->ij", diff, diff)
+
+
+def delta_e_ciede2000(lab, palette):
+    """CIEDE2000 ΔE between every color and every palette color."""
+    l1, a1, b1 = (lab[:, None, i] for i in range(3))
+    l2, a2, b2 = (palette[None, :, i] for i in range(3))
+
+    c_bar7 = ((numpy.hypot(a1, b1) + numpy.hypot(a2, b2)) / 2) ** 7
+    g = 0.5 * (1 - numpy.sqrt(c_bar7 / (c_bar7 + 25.0**7)))
+    a1, a2 = a1 * (1 + g), a2 * (1 + g)
+
+    c1, c2 = numpy.hypot(a1, b1), numpy.hypot(a2, b2)
+    h1 = numpy.degrees(numpy.arctan2(b1, a1)) % 360
+    h2 = numpy.degrees(numpy.arctan2(b2, a2)) % 360
+    chroma = c1 * c2
+    achromatic = chroma == 0
+
+    dl = l2 - l1
+    dc = c2 - c1
+    dh = h2 - h1
+    dh = numpy.where(dh > 180, dh - 360, numpy.where(dh < -180, dh + 360, dh))
+    dh = numpy.where(achromatic, 0, dh)
+    dh = 2 * numpy.sqrt(chroma) * numpy.sin(numpy.radians(dh) / 2)
+
+    l_bar = (l1 + l2) / 2
+    c_bar = (c1 + c2) / 2
+    h_sum = h1 + h2
+    h_bar = numpy.where(
+        abs(h1 - h2) <= 180,
+        h_sum / 2,
+        numpy.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2),
+    )
+    h_bar = numpy.where(achromatic, h_sum, h_bar)
+
+    t = (
+        1
+        - 0.17 * numpy.cos(numpy.radians(h_bar - 30))
+        + 0.24 * numpy.cos(numpy.radians(2 * h_bar))
+        + 0.32 * numpy.cos(numpy.radians(3 * h_bar + 6))
+        - 0.20 * numpy.cos(numpy.radians(4 * h_bar - 63))
+    )
+    theta = 30 * numpy.exp(-(((h_bar - 275) / 25) ** 2))
+    c_bar7 = c_bar**7
+    rc = 2 * numpy.sqrt(c_bar7 / (c_bar7 + 25.0**7))
+    sl = 1 + 0.015 * (l_bar - 50) ** 2 / numpy.sqrt(20 + (l_bar - 50) ** 2)
+    sc = 1 + 0.045 * c_bar
+    sh = 1 + 0.015 * c_bar * t
+    rt = -numpy.sin(numpy.radians(2 * theta)) * rc
+
+    dl, dc, dh = dl / sl, dc / sc, dh / sh
+    return numpy.sqrt(dl**2 + dc**2 + dh**2 + rt * dc * dh)
+
+
+DISTANCES = {
+    "cie76": delta_e_cie76,
+    "ciede2000": delta_e_ciede2000,
+}
+
+
+class MetricIndex(ColorIndex):
+    """Perceptual nearest color search in the CIELAB space.
+
+    The palette is converted once, colors are converted and compared against
+    the whole palette in bulk, the lowest palette index wins on ties.
+    """
+
+    name = "metric"
+
+    def __init__(self, colors: "List[RGB]", metric: str = "ciede2000") -> None:
+        if metric not in DISTANCES:
+            raise ValueError(f"Unknown color metric '{metric}'.")
+
+        require_numpy(f"The {metric} metric")
+        super().__init__(colors)
+
+        self.metric = metric
+        self._distance = DISTANCES[metric]
+        self._palette = srgb_to_lab(numpy.array(colors).reshape(-1, 3))
+
+    def nearest(self, rgb: "RGB") -> int:
+        return int(self.nearest_many([rgb])[0]) if len(self) else -1
+
+    def nearest_many(self, colors):
+        colors = numpy.asarray(colors).reshape(-1, 3)
+        result = numpy.empty(len(colors), dtype=numpy.intp)
+
+        for start in range(0, len(colors), CHUNK_SIZE):
+            lab = srgb_to_lab(colors[start : start + CHUNK_SIZE])
+            distances = self._distance(lab, self._palette)
+            result[start : start + CHUNK_SIZE] = distances.argmin(axis=1)
+
+        return result
+
+    def __str__(self):
+        return f"Index<{self.name}:{self.metric}>"
@@ -1,10 +1,58 @@
+import hashlib
 import json
+import logging
 from abc import ABC
-from typing import List, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from PIL import Image
+
+from tarraz import constants
+from tarraz.compat import HAS_NUMPY, numpy
 from tarraz.logger import logger
-from tarraz.models import Color, RGB
-from tarraz.utils import euclidean_distance
+from tarraz.models import RGB, Color, ColorStore
+from tarraz.providers.cache import MatchCache
+from tarraz.providers.compiled import compiled_path, read_palette
+from tarraz.providers.index import ColorIndex, get_index
+from tarraz.providers.table import ColorTable
+
+if TYPE_CHECKING:
+    from PIL.Image import Image as ImageType
+
+    from tarraz.providers.compiled import CompiledPalette
+
+# Marks colors missing from the matching colors cache, None is a valid match.
+_MISSING = object()
+
+
+def _to_rgb(image: "ImageType") -> "ImageType":
+    return image if image.mode in ("RGB", "RGBA") else image.convert("RGB")
+
+
+def _iter_colors(colors) -> "Iterator[tuple]":
+    """(red, green, blue) tuples of an image, a bytes buffer or a sequence."""
+    if isinstance(colors, Image.Image):
+        colors = _to_rgb(colors).getdata()
+    elif isinstance(colors, (bytes, bytearray, memoryview)):
+        data = memoryview(colors).cast("B")
+        colors = zip(data[0::3], data[1::3], data[2::3])
+
+    for color in colors:
+        yield tuple(color[:3])
+
+
+def _as_array(colors):
+    """(..., 3) array of an image, a bytes buffer or a sequence."""
+    if isinstance(colors, Image.Image):
+        return numpy.asarray(_to_rgb(colors))[..., :3]
+
+    if isinstance(colors, (bytes, bytearray, memoryview)):
+        return numpy.frombuffer(colors, dtype=numpy.uint8).reshape(-1, 3)
+
+    colors = numpy.asarray(colors, dtype=numpy.uint8)
+    if colors.ndim < 2:
+        colors = colors.reshape(-1, 3)
+
+    return colors[..., :3]
 
 
 class ColorProvider(ABC):
@@ -12,19 +60,75 @@ class ColorProvider(ABC):
         self,
         data_path: Optional[str] = None,
         colors: Optional[List["Color"]] = None,
+        table_bits: Optional[int] = None,
+        metric: str = "rgb",
+        match_cache: "Optional[MatchCache]" = None,
     ) -> None:
         if not data_path and not colors:
             raise ValueError(
                 "You need to supply either a data path or a colors list..."
             )
 
-        self.matching_colors = {}
+        # The color index is built on the first match, wrong options fail now.
+        if metric not in constants.METRICS:
+            raise ValueError(f"Unknown color metric '{metric}'.")
+        if table_bits and table_bits not in constants.TABLE_BITS_CHOICES:
+            raise ValueError(f"Unsupported lookup table bits '{table_bits}'.")
+
+        if match_cache is None:
+            match_cache = MatchCache(max_entries=constants.MATCH_CACHE_SIZE)
+        self.matching_colors = match_cache
         self._data_path = data_path
+        self.metric = metric
+        self._fingerprint: "Optional[str]" = None
+        self._palette: "Optional[CompiledPalette]" = None
         self.colors = colors if colors else self._read_colors()
+        self.store = ColorStore(self.colors)
+
+        self._table_bits = table_bits
+        self._color_index: "Optional[ColorIndex]" = None
 
         logger.debug("%d colors successfully processed.", len(self.colors))
 
+    @property
+    def color_index(self) -> "ColorIndex":
+        """Nearest color search of the palette, built on the first match."""
+        if self._color_index is None:
+            self._color_index = self._build_color_index()
+
+        return self._color_index
+
+    def _build_color_index(self) -> "ColorIndex":
+        rgb_colors = self.store.rgb_colors
+        palette, metric, table_bits = self._palette, self.metric, self._table_bits
+        if (
+            palette is not None
+            and palette.table is not None
+            and palette.metric == metric
+            # Only 8 bits tables match exactly, lower ones are used when asked for.
+            and (table_bits or 8) == palette.table_bits
+        ):
+            # Prebuilt by the palette compilation, nothing left to build.
+            return ColorTable(
+                rgb_colors, bits=palette.table_bits, metric=metric, table=palette.table
+            )
+
+        if table_bits:
+            return ColorTable(rgb_colors, bits=table_bits, metric=metric)
+
+        return get_index(rgb_colors, metric=metric)
+
     def _read_colors(self) -> "List[Color]":
+        path = compiled_path(self._data_path)
+        if path is not None:
+            try:
+                self._palette = read_palette(path)
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring invalid compiled palette %s: %s", path, e)
+            else:
+                logger.info("Reading compiled colors from %s", path)
+                return self._palette.colors
+
         logger.info("Reading colors from %s", self._data_path)
 
         with open(self._data_path, mode="r") as data_file:
@@ -32,49 +136,103 @@ class ColorProvider(ABC):
 
         return colors
 
-    def get_matching_color(self, rgb_color: "RGB") -> "Optional[Color]":
-        logger.debug("Getting a matching color for color %s.", rgb_color.css)
+    @property
+    def fingerprint(self) -> str:
+        """Digest of the provider colors, changes whenever the palette does."""
+        if self._fingerprint is None:
+            digest = hashlib.sha1(self.__class__.__name__.encode("utf-8"))
+            if self._palette is not None:
+                # Computed once by the palette compilation.
+                digest.update(self._palette.digest)
+            else:
+                digest.update(self.store.digest())
+            self._fingerprint = digest.hexdigest()
 
-        if rgb_color in self.matching_colors:
-            logger.debug("Loading matching color from cache...")
-            return self.matching_colors[rgb_color]
+        return self._fingerprint
+
+    def get_matching_color(self, rgb_color: "RGB") -> "Optional[Color]":
+        matching_color = self.matching_colors.get(rgb_color, _MISSING)
+        if matching_color is not _MISSING:
+            return matching_color
 
         best_matching_index = self._get_best_color_index(rgb_color)
 
         if best_matching_index >= 0:
             matching_color = self.colors[best_matching_index]
+        else:
+            matching_color = None
+
+        if logger.isEnabledFor(logging.DEBUG):
             logger.debug(
                 "Found %s as matching color for color %s.",
-                matching_color.rgb.css,
+                matching_color.rgb.css if matching_color else None,
                 rgb_color.css,
             )
-        else:
-            matching_color = None
-            logger.debug("No matching color found for %s color.", rgb_color.css)
 
-        logger.debug("Storing matching color in cache...")
         self.matching_colors[rgb_color] = matching_color
 
         return matching_color
 
-    def _get_best_color_index(self, rgb_color: "RGB") -> int:
-        min_distance = float("inf")
-        min_distance_index = float("-inf")
+    def get_matching_colors(self, colors) -> "Tuple[Any, List[Color]]":
+        """Match many colors at once.
+
+        `colors` is an image, a buffer of (red, green, blue) bytes or a sequence
+        of colors. Returns the position of every color match in the list of the
+        unique matching colors, along with that list.
+        """
+        indices = self.nearest_indices(colors)
+
+        if HAS_NUMPY:
+            matched, positions = numpy.unique(indices, return_inverse=True)
+            positions = positions.reshape(indices.shape)
+            return positions, [self.colors[i] for i in matched.tolist()]
+
+        matched = sorted(set(indices))
+        order = {index: i for i, index in enumerate(matched)}
+        return [order[index] for index in indices], [self.colors[i] for i in matched]
+
+    def nearest_indices(self, colors):
+        """Palette index of the nearest color of every color, see `get_matching_colors`.
+
+        Colors are deduplicated before being matched. Returns an array shaped as
+        the colors, or as the image, with numpy and a flat list otherwise.
+        """
+        if not HAS_NUMPY:
+            best: "Dict[tuple, int]" = {}
+            indices = []
+            for color in _iter_colors(colors):
+                if color not in best:
+                    best[color] = self.color_index.nearest(color)
+                indices.append(best[color])
+            return indices
 
-        for i, provider_color in enumerate(self.colors):
-            dist = euclidean_distance(provider_color.rgb, rgb_color)
+        pixels = _as_array(colors)
+        shape = pixels.shape[:-1]
 
-            if dist < min_distance:
-                min_distance = dist
-                min_distance_index = i
+        if isinstance(self.color_index, ColorTable):
+            # Every color is already matched, a single lookup does it all.
+            return self.color_index.nearest_many(pixels).reshape(shape)
 
-        return min_distance_index
+        keys = (
+            pixels[..., 0].astype(numpy.uint32) << 16
+            | pixels[..., 1].astype(numpy.uint32) << 8
+            | pixels[..., 2]
+        )
+        unique, inverse = numpy.unique(keys, return_inverse=True)
+        logger.debug("Matching %d unique colors...", len(unique))
+
+        unique_colors = numpy.stack(
+            (unique >> 16, (unique >> 8) & 0xFF, unique & 0xFF), axis=-1
+        )
+        best = numpy.asarray(self.color_index.nearest_many(unique_colors))
+
+        return best[inverse.reshape(-1)].reshape(shape)
+
+    def _get_best_color_index(self, rgb_color: "RGB") -> int:
+        return self.color_index.nearest(rgb_color)
 
     def index(self, rgb_color: "RGB") -> int:
-        for i, c in enumerate(self.colors):
-            if c.rgb == rgb_color:
-                return i
-        return -1
+        return self.store.index(rgb_color)
 
     def get(self, rgb_color: "RGB", default: "Optional" = None) -> "Optional[Color]":
         index = self.index(rgb_color)
@@ -84,6 +242,33 @@ class ColorProvider(ABC):
 
         return self.colors[index]
 
+    def get_by_code(self, code: str, default: "Optional" = None) -> "Optional[Color]":
+        index = self.store.index_of_code(code)
+
+        if index < 0:
+            return default
+
+        return self.colors[index]
+
+    def get_many(
+        self, rgb_colors: "Iterable[RGB]", default: "Optional" = None
+    ) -> "List[Optional[Color]]":
+        """Exact palette colors of many colors, `default` for the missing ones."""
+        colors = self.colors
+        return [
+            colors[index] if index >= 0 else default
+            for index in self.store.indices(rgb_colors)
+        ]
+
+    def get_many_by_code(
+        self, codes: "Iterable[str]", default: "Optional" = None
+    ) -> "List[Optional[Color]]":
+        colors, index_of_code = self.colors, self.store.index_of_code
+        return [
+            colors[index] if index >= 0 else default
+            for index in map(index_of_code, codes)
+        ]
+
     def __str__(self):
         name = self.__class__.__name__
         if "Provider" in name:
@@ -0,0 +1,66 @@
+import functools
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Type, Union
+
+from tarraz.providers.dmc import DMCProvider
+from tarraz.providers.provider import ColorProvider
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# Registered providers factories, by name.
+_providers: "Dict[str, Callable[..., ColorProvider]]" = {}
+
+
+class PaletteProvider(ColorProvider):
+    """Provider of a registered palette file, named after its brand."""
+
+    def __init__(self, name: str, **kwargs) -> None:
+        self.name = name
+        super().__init__(**kwargs)
+
+    def __str__(self):
+        return self.name
+
+
+def register_provider(
+    name: str,
+    provider: "Optional[Type[ColorProvider]]" = None,
+    data_path: "Optional[Union[str, Path]]" = None,
+) -> None:
+    """Register a provider class, or a JSON or compiled palette file, by name.
+
+    Registered providers are built by `get_provider`, a palette file is served
+    by a `PaletteProvider`, reading its compiled form when it's up to date.
+    """
+    if not provider and not data_path:
+        raise ValueError("You need to supply either a provider or a data path...")
+
+    if provider is None:
+        provider = functools.partial(PaletteProvider, name, data_path=data_path)
+    elif data_path:
+        provider = functools.partial(provider, data_path=data_path)
+
+    _providers[name.lower()] = provider
+
+
+def provider_factory(name: str) -> "Callable[..., ColorProvider]":
+    """Callable building the provider registered under the name, picklable."""
+    try:
+        return _providers[name.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Unknown color provider '{name}'. "
+            f"Available providers are: {provider_names()}."
+        ) from None
+
+
+def get_provider(name: str, **kwargs) -> "ColorProvider":
+    """Build the provider registered under the name, `kwargs` are passed along."""
+    return provider_factory(name)(**kwargs)
+
+
+def provider_names() -> "List[str]":
+    return sorted(_providers)
+
+
+register_provider("dmc", DMCProvider)
@@ -0,0 +1,68 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Union
+
+from tarraz import constants
+from tarraz.logger import logger
+from tarraz.providers.compiled import dump_palette
+from tarraz.providers.table import ColorTable
+
+if TYPE_CHECKING:
+    from tarraz.providers.provider import ColorProvider
+
+# Memory backed file system, the published palettes never touch the disk there.
+SHARED_MEMORY_DIR = "/dev/shm"
+
+
+def _shared_dir() -> "Optional[str]":
+    if os.path.isdir(SHARED_MEMORY_DIR) and os.access(SHARED_MEMORY_DIR, os.W_OK):
+        return SHARED_MEMORY_DIR
+
+    return None
+
+
+class SharedPalette(object):
+    """Palette of a provider, and its lookup table, published in a mapped file.
+
+    Providers given `path` as their data path map the same pages instead of
+    reading or building their own copy, so the table is paid once per host
+    rather than once per process. The file is removed by `close`.
+    """
+
+    def __init__(
+        self,
+        provider: "ColorProvider",
+        directory: "Optional[Union[str, Path]]" = None,
+    ) -> None:
+        index = provider.color_index
+        table = index if isinstance(index, ColorTable) else None
+
+        fd, path = tempfile.mkstemp(
+            prefix="tarraz-",
+            suffix=constants.COMPILED_COLORS_EXTENSION,
+            dir=directory or _shared_dir(),
+        )
+        with os.fdopen(fd, "wb") as f:
+            f.write(dump_palette(provider.colors, table))
+
+        self.path = Path(path)
+        logger.debug("%s palette published in %s.", provider, self.path)
+
+    def close(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Still mapped by a process on some platforms.
+            logger.warning("Failed to remove shared palette %s: %s", self.path, e)
+
+    def __enter__(self) -> "SharedPalette":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __str__(self):
+        return str(self.path)
@@ -0,0 +1,184 @@
+import hashlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, List, Optional, Union
+
+from tarraz import constants
+from tarraz.compat import numpy, require_numpy
+from tarraz.files import atomic_write
+from tarraz.logger import logger
+from tarraz.providers.index import ColorIndex, GridIndex
+from tarraz.providers.metrics import MetricIndex
+
+if TYPE_CHECKING:
+    from tarraz.models import RGB
+
+
+class ColorTable(ColorIndex):
+    """Nearest palette index of every RGB color, quantized to `bits` per channel.
+
+    The table is built once per palette and stored in the cache directory, then
+    memory mapped by every later run. With 8 bits it holds every RGB color and
+    matches the other indexes exactly, lower bits match the center of each
+    quantized cell for a smaller table. Perceptual metrics tables take much
+    longer to build, lower bits are advised for them. A prebuilt `table`, like
+    the one embedded in a compiled palette, skips the cache directory.
+    """
+
+    name = "table"
+
+    def __init__(
+        self,
+        colors: "List[RGB]",
+        bits: int = constants.TABLE_BITS,
+        cache_dir: "Optional[Union[str, Path]]" = None,
+        metric: str = "rgb",
+        table: "Optional[Any]" = None,
+    ) -> None:
+        require_numpy("The color lookup table")
+        if bits not in constants.TABLE_BITS_CHOICES:
+            raise ValueError(f"Unsupported lookup table bits '{bits}'.")
+
+        super().__init__(colors)
+
+        self.bits = bits
+        self.metric = metric
+        self._shift = 8 - bits
+        self._dtype = numpy.uint8 if len(colors) <= 256 else numpy.uint16
+        self._colors = colors
+
+        self.path = Path(cache_dir or constants.CACHE_DIR) / self._file_name()
+        if table is not None and not self._check(table):
+            raise ValueError("Mismatching prebuilt lookup table.")
+
+        if table is not None:
+            self.table = table
+            return
+
+        self.table = self._load() if self.path.exists() else None
+        if self.table is None:
+            self.table = self._build()
+            self._save()
+
+    def _file_name(self) -> str:
+        digest = hashlib.sha1()
+        for color in self._colors:
+            digest.update(bytes(color))
+
+        return f"{digest.hexdigest()}-{self.metric}-{self.bits}.npy"
+
+    def _load(self):
+        try:
+            table = numpy.load(self.path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring invalid lookup table %s: %s", self.path, e)
+            return None
+
+        if not self._check(table):
+            logger.warning("Ignoring mismatching lookup table %s.", self.path)
+            return None
+
+        logger.debug("Lookup table loaded from %s.", self.path)
+        return table
+
+    def _check(self, table) -> bool:
+        return table.shape == (1 << 3 * self.bits,) and table.dtype == self._dtype
+
+    def _build(self):
+        logger.info(
+            "Building a %d bits %s color lookup table...", self.bits, self.metric
+        )
+
+        if self.metric != "rgb":
+            return self._build_metric()
+
+        return self._build_rgb()
+
+    def _cell_centers(self):
+        return (numpy.arange(1 << self.bits, dtype=numpy.int32) << self._shift) + (
+            (1 << self._shift) >> 1
+        )
+
+    def _build_metric(self):
+        """Match the center of every cell, a red slice of the cells at a time."""
+        index = MetricIndex(self._colors, self.metric)
+        values = self._cell_centers()
+        green, blue = numpy.meshgrid(values, values, indexing="ij")
+
+        table = numpy.empty((len(values), len(values) ** 2), self._dtype)
+        for i, red in enumerate(values.tolist()):
+            colors = numpy.stack(
+                (numpy.full(green.size, red), green.ravel(), blue.ravel()), axis=-1
+            )
+            table[i] = index.nearest_many(colors)
+
+        return table.reshape(-1)
+
+    def _build_rgb(self):
+        """Match the center of every cell against the grid index candidates.
+
+        Cells are visited a red slice of the grid at a time, every candidate
+        slot is compared with all the colors of the slice at once.
+        """
+        index = GridIndex(self._colors)
+        cells = 1 << index._bits
+        per_cell = 1 << (self.bits - index._bits)
+
+        values = self._cell_centers().reshape(cells, per_cell)
+        green = values[None, :, :, None, None]
+        blue = values[None, None, None, :, :]
+
+        candidates = index._candidates.reshape(cells, cells, cells, -1)
+        table = numpy.empty(
+            (cells, per_cell, cells, per_cell, cells, per_cell), self._dtype
+        )
+        for red_cell in range(cells):
+            red = values[red_cell][:, None, None, None, None]
+            shape = (per_cell, cells, per_cell, cells, per_cell)
+            best = numpy.full(shape, numpy.iinfo(numpy.int32).max, dtype=numpy.int32)
+            best_index = numpy.zeros(shape, dtype=self._dtype)
+
+            # Candidates are sorted, keeping the first nearest one breaks ties
+            # on the lowest index.
+            for slot in numpy.moveaxis(candidates[red_cell], -1, 0):
+                colors = numpy.moveaxis(index._palette[slot], -1, 0)
+                r, g, b = colors[:, None, :, None, :, None]
+                distances = (red - r) ** 2 + (green - g) ** 2 + (blue - b) ** 2
+
+                nearer = distances < best
+                best_index = numpy.where(
+                    nearer, slot[None, :, None, :, None], best_index
+                )
+                numpy.minimum(best, distances, out=best)
+
+            table[red_cell] = best_index
+
+        return table.reshape(-1)
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_write(self.path) as f:
+                numpy.save(f, self.table)
+        except OSError as e:
+            logger.warning("Failed to store lookup table %s: %s", self.path, e)
+            return
+
+        logger.debug("Lookup table stored in %s.", self.path)
+        # Memory mapped like any later run, the built table is released.
+        table = self._load()
+        if table is not None:
+            self.table = table
+
+    def __str__(self):
+        return f"Index<{self.name}:{self.metric}:{self.bits}>"
+
+    def _keys(self, red, green, blue):
+        shift, bits = self._shift, self.bits
+        return (red >> shift) << 2 * bits | (green >> shift) << bits | blue >> shift
+
+    def nearest(self, rgb: "RGB") -> int:
+        return int(self.table[self._keys(*rgb)])
+
+    def nearest_many(self, colors):
+        colors = numpy.asarray(colors).reshape(-1, 3).astype(numpy.uint32)
+        return self.table[self._keys(*colors.T)].astype(numpy.intp)
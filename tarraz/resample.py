@@ -0,0 +1,189 @@
+from typing import TYPE_CHECKING, Iterator, List
+
+from PIL import Image
+
+from tarraz.compat import numpy, require_numpy
+from tarraz.constants import MEMORY_BUDGET
+from tarraz.logger import logger
+from tarraz.models import ImageSize
+
+if TYPE_CHECKING:
+    from PIL.Image import Image as ImageType
+
+    from tarraz.loader import StripReader
+
+# Strip sized buffers alive at once while a strip is decoded and reduced.
+STRIP_COPIES = 4
+
+
+def grid_size(size: "ImageSize", x_count: int) -> "ImageSize":
+    """Stitches count on both axes, keeping the image aspect ratio."""
+    height = max(1, round(size.height * x_count / size.width))
+    return ImageSize(x_count, height)
+
+
+def block_edges(length: int, count: int) -> "List[int]":
+    """Edges of `count` blocks splitting `length` pixels, the first one is 0.
+
+    Blocks sizes differ by a pixel at most, every pixel belongs to a block.
+    """
+    return [i * length // count for i in range(count + 1)]
+
+
+def _gather_blocks(pixels, rows, x_edges, y_edges, height: int, width: int):
+    """(rows, columns, block pixels, 3) array of the blocks of the given size."""
+    columns = numpy.flatnonzero(numpy.diff(x_edges) == width)
+    row_index = y_edges[rows, None] + numpy.arange(height)
+    column_index = x_edges[columns, None] + numpy.arange(width)
+
+    blocks = pixels[row_index[:, :, None, None], column_index[None, None, :, :]]
+    blocks = blocks.transpose(0, 2, 1, 3, 4).reshape(len(rows), len(columns), -1, 3)
+    return columns, blocks
+
+
+def reduce_median(blocks):
+    return numpy.median(blocks, axis=2).round().astype(numpy.uint8)
+
+
+def reduce_dominant(blocks):
+    """Most frequent color of every block, the lowest color wins on ties."""
+    blocks = blocks.astype(numpy.uint32)
+    keys = blocks[..., 0] << 16 | blocks[..., 1] << 8 | blocks[..., 2]
+    rows, columns, count = keys.shape
+
+    keys = numpy.sort(keys.reshape(-1, count), axis=1)
+    positions = numpy.arange(count)
+
+    # Length of the run of equal colors ending at every position.
+    starts = numpy.ones(keys.shape, dtype=bool)
+    starts[:, 1:] = keys[:, 1:] != keys[:, :-1]
+    run_starts = numpy.maximum.accumulate(numpy.where(starts, positions, 0), axis=1)
+    runs = positions - run_starts
+
+    dominant = keys[numpy.arange(len(keys)), runs.argmax(axis=1)]
+    dominant = numpy.stack(
+        (dominant >> 16, (dominant >> 8) & 0xFF, dominant & 0xFF), axis=-1
+    )
+    return dominant.reshape(rows, columns, 3).astype(numpy.uint8)
+
+
+NUMPY_REDUCERS = {
+    "median": reduce_median,
+    "dominant": reduce_dominant,
+}
+
+
+def reduce_blocks(
+    image: "ImageType",
+    x_edges: "List[int]",
+    y_edges: "List[int]",
+    reducer: str,
+) -> "ImageType":
+    """Reduce every block between the given edges into a single pixel.
+
+    Blocks of the same size are reduced together, there are 4 sizes at most.
+    """
+    if reducer not in NUMPY_REDUCERS:
+        raise ValueError(f"Unknown reducer '{reducer}'.")
+
+    require_numpy(f"The {reducer} reducer")
+    pixels = numpy.asarray(image)
+    x_edges, y_edges = numpy.asarray(x_edges), numpy.asarray(y_edges)
+    widths, heights = numpy.diff(x_edges), numpy.diff(y_edges)
+
+    result = numpy.empty((len(heights), len(widths), 3), dtype=numpy.uint8)
+    for height in numpy.unique(heights).tolist():
+        rows = numpy.flatnonzero(heights == height)
+        for width in numpy.unique(widths).tolist():
+            columns, blocks = _gather_blocks(
+                pixels, rows, x_edges, y_edges, height, width
+            )
+            result[numpy.ix_(rows, columns)] = NUMPY_REDUCERS[reducer](blocks)
+
+    return Image.fromarray(result)
+
+
+def _is_smaller(size: "ImageSize", grid: "ImageSize") -> bool:
+    return size.width < grid.width or size.height < grid.height
+
+
+def resample(image: "ImageType", x_count: int, reducer: str = "box") -> "ImageType":
+    """Reduce the image straight into one pixel per stitch.
+
+    Every stitch covers an equal share of the image, the box reducer averages
+    fractional areas, the others whole pixels blocks.
+    """
+    size = ImageSize(*image.size)
+    grid = grid_size(size, x_count)
+    logger.info(
+        f"Resampling image to [{grid.width}x{grid.height}] stitches using {reducer}..."
+    )
+
+    if _is_smaller(size, grid):
+        # The image is smaller than the grid, nothing to reduce.
+        return image.resize(grid, Image.NEAREST)
+
+    if reducer == "box":
+        return image.resize(grid, Image.BOX)
+
+    return reduce_blocks(
+        image,
+        block_edges(size.width, grid.width),
+        block_edges(size.height, grid.height),
+        reducer,
+    )
+
+
+def resample_strips(
+    reader: "StripReader",
+    x_count: int,
+    reducer: str = "box",
+    memory_budget: int = MEMORY_BUDGET,
+) -> "Iterator[ImageType]":
+    """Reduce the image into stitches strip by strip, yields rows of stitches.
+
+    Strips are made of whole stitches rows, as many as the memory budget allows,
+    and reduced as `resample` reduces the whole image. The box reducer may only
+    round the pixels lying exactly on a strip edge differently.
+    """
+    size = reader.size
+    grid = grid_size(size, x_count)
+
+    if _is_smaller(size, grid):
+        # The image is smaller than the grid, nothing to reduce.
+        yield resample(reader.read(0, size.height), x_count, reducer)
+        return
+
+    x_edges = block_edges(size.width, grid.width)
+    y_edges = block_edges(size.height, grid.height)
+    max_rows = max(1, memory_budget // (size.width * 3 * STRIP_COPIES))
+    logger.info(
+        f"Resampling image to [{grid.width}x{grid.height}] stitches using {reducer}, "
+        f"{max_rows} rows at a time..."
+    )
+
+    start = 0
+    while start < grid.height:
+        end = start + 1
+        while end < grid.height and y_edges[end + 1] - y_edges[start] <= max_rows:
+            end += 1
+
+        if reducer == "box":
+            # Fractional stitches edges, the strip covers their partial rows.
+            top = y_edges[start]
+            bottom = min(size.height, -(-end * size.height // grid.height))
+            box = (
+                0,
+                start * size.height / grid.height - top,
+                size.width,
+                end * size.height / grid.height - top,
+            )
+            strip = reader.read(top, bottom)
+            yield strip.resize((grid.width, end - start), Image.BOX, box=box)
+        else:
+            top = y_edges[start]
+            strip = reader.read(top, y_edges[end])
+            edges = [edge - top for edge in y_edges[start : end + 1]]
+            yield reduce_blocks(strip, x_edges, edges, reducer)
+
+        start = end
@@ -1,5 +1,5 @@
-from .stitcher import Stitcher
+from .stitcher import Stitcher, StitchJob
 from .display import DisplayStitcher
 from .svg import SVGStitcher
 
-__all__ = ("DisplayStitcher", "Stitcher", "SVGStitcher")
+__all__ = ("DisplayStitcher", "Stitcher", "StitchJob", "SVGStitcher")
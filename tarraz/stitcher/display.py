@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Optional, Tuple
 
 from PIL import Image
 
@@ -21,6 +21,15 @@ class DisplayStitcher(Stitcher):
             for j in range(coordinate.y, coordinate.y + size):
                 pixels[i - size, j - size] = color.rgb if color else (255, 255, 255, 0)
 
+    def plan_cell(self, color: "Optional[Color]") -> "Tuple[int, int, int]":
+        return color.rgb if color else (255, 255, 255)
+
+    def draw_planned_cell(
+        self, x: int, y: int, size: int, plan: "Tuple[int, int, int]"
+    ) -> None:
+        # Same area as `draw_cell`, filled at once.
+        self.result.paste(plan, (x - size, y - size, x, y))
+
     def finish(self) -> None:
         self.result.show()
 
@@ -1,6 +1,6 @@
 import os
 from abc import ABC
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
 from tarraz import constants
 from tarraz.logger import logger
@@ -9,6 +9,75 @@ from tarraz.models import Coordinate
 if TYPE_CHECKING:
     from tarraz.models import RGB, Color, ImageSize, Palette, PaletteImage
 
+# Same colored block of cells as (palette index, x, y, width, height), in cells.
+Block = Tuple[int, int, int, int, int]
+
+
+def merge_cells(pattern: "PaletteImage") -> "Iterator[Block]":
+    """Blocks covering the pattern, every one filled with a single color.
+
+    Rows are split in runs of the same color, a run spanning the same columns
+    as one of the previous row extends it down instead of starting a block.
+    """
+    # Blocks still growing, by (start column, end column, palette index).
+    growing: "Dict[Tuple[int, int, int], int]" = {}
+
+    for y, row in enumerate(pattern):
+        runs = set()
+        x, width = 0, len(row)
+        while x < width:
+            color_i = row[x]
+            end = x + 1
+            while end < width and row[end] == color_i:
+                end += 1
+
+            runs.add((x, end, color_i))
+            x = end
+
+        for run in [run for run in growing if run not in runs]:
+            start, end, color_i = run
+            top = growing.pop(run)
+            yield color_i, start, top, end - start, y - top
+
+        for run in runs:
+            growing.setdefault(run, y)
+
+    height = len(pattern)
+    for (start, end, color_i), top in growing.items():
+        yield color_i, start, top, end - start, height - top
+
+
+class StitchJob(object):
+    """Pattern being stitched, with what all of its variants share.
+
+    `transparent` flags the palette indices left out, `blocks` are the merged
+    cells of the pattern, computed on first use.
+    """
+
+    def __init__(
+        self,
+        pattern: "PaletteImage",
+        colors: "Palette",
+        cell_size: int,
+        size: "ImageSize",
+        transparent: "Optional[List[RGB]]" = None,
+    ) -> None:
+        self.pattern = pattern
+        self.colors = colors
+        self.cell_size = cell_size
+        self.size = size
+
+        transparent = transparent or []
+        self.transparent = [color.rgb in transparent for color in colors]
+        self._blocks: "Optional[List[Block]]" = None
+
+    @property
+    def blocks(self) -> "List[Block]":
+        if self._blocks is None:
+            self._blocks = list(merge_cells(self.pattern))
+
+        return self._blocks
+
 
 class Stitcher(ABC):
     def __init__(
@@ -17,6 +86,7 @@ class Stitcher(ABC):
         black_white: bool = False,
         minor_lines: bool = False,
         symbols: bool = True,
+        merge_cells: bool = False,
         scale: int = 20,
         save_to: "Optional[str]" = None,
         *args,
@@ -25,6 +95,7 @@ class Stitcher(ABC):
         self._black_white = black_white
         self._minor_lines = minor_lines
         self._symbols = symbols
+        self._merge_cells = merge_cells
         self._scale = scale
 
         self.name = name
@@ -60,6 +131,34 @@ class Stitcher(ABC):
     ) -> NotImplemented:
         return NotImplemented
 
+    @property
+    def draws_cells(self) -> bool:
+        """Whether `draw_cell` is called for every cell of the pattern."""
+        return True
+
+    def begin_cells(self, job: "StitchJob") -> None:
+        """Called before the cells are drawn."""
+
+    def plan_cell(self, color: "Optional[Color]") -> "Any":
+        """How cells of the color are drawn, None for the transparent ones.
+
+        Computed once per palette color, before the cells are drawn, and given
+        to `draw_planned_cell` for every cell of that color.
+        """
+        return color
+
+    def render_plan(self, job: "StitchJob") -> "List[Any]":
+        return [
+            self.plan_cell(None if skipped else color)
+            for color, skipped in zip(job.colors, job.transparent)
+        ]
+
+    def draw_planned_cell(self, x: int, y: int, size: int, plan: "Any") -> None:
+        self.draw_cell(Coordinate(x, y), size, color=plan)
+
+    def end_cells(self, job: "StitchJob", config: dict) -> None:
+        """Called once all the cells are drawn."""
+
     def draw_cells(
         self,
         pattern: "PaletteImage",
@@ -69,20 +168,41 @@ class Stitcher(ABC):
         config: "Optional[dict]" = None,
         transparent: "Optional[List[RGB]]" = None,
     ):
-        if not transparent:
-            transparent = []
+        job = StitchJob(pattern, colors, cell_size, size, transparent)
+        self._draw_variants_cells([self], job, [config or {}])
+
+    @staticmethod
+    def _draw_variants_cells(
+        variants: "List[Stitcher]", job: "StitchJob", configs: "List[dict]"
+    ) -> None:
+        """Draw the cells of every variant in a single pass over the pattern.
+
+        Every variant plans how each palette color is drawn beforehand, then
+        every cell coordinate is computed once and handed to every variant
+        drawing cells, along with the plan of the cell color.
+        """
+        for variant in variants:
+            variant.begin_cells(job)
+
+        drawers = [
+            (variant.draw_planned_cell, variant.render_plan(job))
+            for variant in variants
+            if variant.draws_cells
+        ]
+        if drawers:
+            cell_size = job.cell_size
+
+            y = cell_size
+            for row in job.pattern:
+                x = cell_size
+                for color_i in row:
+                    for draw_cell, plan in drawers:
+                        draw_cell(x, y, cell_size, plan[color_i])
+                    x += cell_size
+                y += cell_size
 
-        x = y = cell_size
-        for row in pattern:
-            for color_i in row:
-                coordinate = Coordinate(x, y)
-                color = (
-                    colors[color_i] if colors[color_i].rgb not in transparent else None
-                )
-                self.draw_cell(coordinate, cell_size, color=color)
-                x += cell_size
-            y += cell_size
-            x = cell_size
+        for variant, config in zip(variants, configs):
+            variant.end_cells(job, config)
 
     @classmethod
     def stitch(
@@ -102,6 +222,8 @@ class Stitcher(ABC):
           * Black/white.
           * Colored picture.
           * Colored with symbols.
+
+        The cells of all the variants are drawn in a single pass over the pattern.
         """
         logger.info("Stitching job started...")
         width = size.width * cell_size
@@ -113,23 +235,25 @@ class Stitcher(ABC):
         if not configs:
             configs = [{"name": "NO_CONFIG"}]
 
+        variants, variants_configs = [], []
         for config in configs:
             variant = cls(**config, save_to=save_to)
 
             if config.get("key"):
                 variant.init(key_size * 13, key_size * len(colors))
                 variant.generate_key(colors, key_size, transparent=transparent)
+                variant.finish()
+                variant.save(ext)
             else:
                 variant.init(width, height)
-                variant.draw_cells(
-                    pattern,
-                    colors,
-                    cell_size,
-                    size,
-                    config=config,
-                    transparent=transparent,
-                )
+                variants.append(variant)
+                variants_configs.append(config)
+
+        if variants:
+            job = StitchJob(pattern, colors, cell_size, size, transparent)
+            cls._draw_variants_cells(variants, job, variants_configs)
 
+        for variant in variants:
             variant.finish()
             variant.save(ext)
 
@@ -1,19 +1,50 @@
-import os
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import escape
 
 from tarraz.logger import logger
 from tarraz.models import Color, Coordinate
 from tarraz.stitcher import Stitcher
 
 if TYPE_CHECKING:
-    from tarraz.models import (
-        RGB,
-        ImageSize,
-        Palette,
-        PaletteImage,
-        StrokeType,
-        SVGAttributes,
-    )
+    from tarraz.models import RGB, Palette, StrokeType
+    from tarraz.stitcher.stitcher import StitchJob
+
+
+# Bytes buffered by the SVG writers before hitting the disk.
+BUFFER_SIZE = 1 << 20
+
+STYLE = (
+    "<style>"
+    ".svg_txt{font-size:20px;}"
+    ".glyph{stroke:#000000;stroke-width:1;stroke:1;}"
+    ".key{fill:rgb(255,255,255);stroke:black;stroke-width:1;}"
+    "</style>\n"
+)
+
+# Symbols path and fill by glyph number, drawn in a 20x20 box.
+GLYPHS: "Dict[int, Tuple[str, str]]" = {
+    # Backslash
+    0: ("M4 4L16 16", ""),
+    # Forward slash
+    1: ("M4 16L16 4M4 10L 16 10", ""),
+    # Black little square
+    2: ("M7 7L7 13 13 13 13 7Z", "black"),
+    3: ("M4 4L10 16L16 4 Z", ""),
+    # Diagonal cross
+    4: ("M4 4L16 16M4 16 L16 4", ""),
+    # Square
+    5: ("M4 4L4 16 16 16 16 4Z", ""),
+    # Upside down black triangle
+    6: ("M4 4L10 16L16 4 Z", "black"),
+    # Black diamond
+    7: ("M10 4L6 10 10 16 14 10Z", "black"),
+    # Little square
+    8: ("M8 8L8 12 12 12 12 8Z", ""),
+    # 8-way cross
+    9: ("M4 4L16 16M4 16 L16 4M10 4L10 16M4 10L16 10", ""),
+    # Black Square
+    10: ("M4 4L4 16 16 16 16 4Z", "black"),
+}
 
 
 class SVGStitcher(Stitcher):
@@ -21,37 +52,28 @@ class SVGStitcher(Stitcher):
         super().__init__(*args, **kwargs)
         self.result = ""
         self.file_name = f"{self._dist_dir}/{self.name}.svg"
-
-        if os.path.exists(self.file_name):
-            logger.debug(f"Removing {self.file_name}...")
-            os.remove(self.file_name)
+        self._file: "Optional[TextIO]" = None
+        # CSS class of every color, None for the transparent ones.
+        self._classes: "Dict[Optional[RGB], str]" = {}
+        # Glyph definition of every symbol color, numbered for this document.
+        self._glyphs: "Dict[RGB, str]" = {}
+        self._cell_size = 0
 
     def init(self, width: int, height: int) -> None:
-        self._append_to_file(
-            f"""
-        <svg xmlns="http://www.w3.org/2000/svg"
-            width="{width}"
-            height="{height}"
-            style ="fill:none;">
-        """
-        )
-        self._append_to_file(
-            """
-            <style>
-                .svg_txt    {
-                    font-size:20px;
-                }
-                .glyph  {
-                    stroke:#000000;
-                    stroke-width:1;
-                    stroke:1;
-                }
-            </style>
-        """
+        # Kept open until `finish`, every element goes through its buffer.
+        logger.debug("Writing %s...", self.file_name)
+        self._file = open(self.file_name, "w", buffering=BUFFER_SIZE)
+        self._write(
+            '<svg xmlns="http://www.w3.org/2000/svg" '
+            'xmlns:xlink="http://www.w3.org/1999/xlink" '
+            f'width="{width}" height="{height}" style="fill:none;">\n'
         )
+        self._write(STYLE)
 
     def finish(self) -> None:
-        self._append_to_file("</svg>")
+        self._write("</svg>\n")
+        self._file.close()
+        self._file = None
 
     def generate_key(
         self,
@@ -63,6 +85,8 @@ class SVGStitcher(Stitcher):
         if not transparent:
             transparent = []
 
+        self._write_defs(colors, size, transparent)
+
         y = 0
         for i in range(len(colors)):
             if colors[i].rgb in transparent:
@@ -76,41 +100,62 @@ class SVGStitcher(Stitcher):
             y += size
             keyed.add(color.code)
 
+    @property
+    def draws_cells(self) -> bool:
+        # Merged cells only need their symbols drawn one by one.
+        return not self._merge_cells or bool(self._symbols and self._glyphs)
+
+    def begin_cells(self, job: "StitchJob") -> None:
+        transparent = [
+            color.rgb for color, skipped in zip(job.colors, job.transparent) if skipped
+        ]
+        self._write_defs(job.colors, job.cell_size, transparent)
+        self._cell_size = job.cell_size
+
+        if self._merge_cells:
+            self._draw_merged_cells(job)
+
+    def plan_cell(self, color: "Optional[Color]") -> str:
+        """Markup of the color cells, formatted with their x and y coordinates.
+
+        Holds the cell rectangle with its style class, unless the cells are
+        merged, followed by the cell symbol.
+        """
+        size = self._cell_size
+        markup = ""
+
+        if not self._merge_cells:
+            css_class = self._classes[color.rgb if color else None]
+            markup = (
+                f'<rect x="{{0}}" y="{{1}}" width="{size}" height="{size}" '
+                f'class="{css_class}"/>\n'
+            )
+
+        glyph_id = self._glyphs.get(color.rgb) if color else None
+        if glyph_id:
+            markup += f'<use xlink:href="#{glyph_id}" x="{{0}}" y="{{1}}"/>\n'
+
+        return markup
+
+    def draw_planned_cell(self, x: int, y: int, size: int, plan: str) -> None:
+        if plan:
+            self._file.write(plan.format(x, y))
+
     def draw_cell(
         self, coordinate: "Coordinate", size: int, color: "Optional[Color]" = None
     ) -> None:
-        fill, symbols, stroke = self._get_svg_attributes(coordinate, size, color=color)
-
-        self._append_to_file(
-            f"""
-            <rect
-                x="{coordinate.x}"
-                y="{coordinate.y}"
-                width="{size}"
-                height="{size}"
-                style="{fill}{stroke}"
-            />
-            {symbols}
-        """
-        )
+        if not self._merge_cells:
+            css_class = self._classes[color.rgb if color else None]
+            self._write(
+                f'<rect x="{coordinate.x}" y="{coordinate.y}" width="{size}" '
+                f'height="{size}" class="{css_class}"/>\n'
+            )
 
-    def draw_cells(
-        self,
-        pattern: "PaletteImage",
-        palette: "Palette",
-        cell_size: int,
-        size: "ImageSize",
-        config: "Optional[dict]" = None,
-        transparent: "Optional[List[RGB]]" = None,
-    ):
-        super().draw_cells(
-            pattern,
-            palette,
-            cell_size,
-            size,
-            config=config,
-            transparent=transparent,
-        )
+        if color:
+            self._use_glyph(color, coordinate.x, coordinate.y)
+
+    def end_cells(self, job: "StitchJob", config: dict) -> None:
+        cell_size, size = job.cell_size, job.size
 
         if config.get("mid_arrows"):
             self._mid_arrows(cell_size, size.width, size.height)
@@ -118,11 +163,116 @@ class SVGStitcher(Stitcher):
         if config.get("major_gridlines"):
             self._major_gridlines(cell_size, size.width, size.height)
 
-    def _append_to_file(self, data: str) -> None:
-        logger.debug("Appending data to file: %s...", self.file_name)
+    def _draw_merged_cells(self, job: "StitchJob") -> None:
+        """Draw the cells as one path per color, then the grid lines.
+
+        Same colored cells are merged in blocks, the grid is drawn over them by
+        a single path instead of every cell stroke. Symbols are drawn on top,
+        cell by cell.
+        """
+        cell_size = job.cell_size
+        classes = [
+            None if skipped else self._classes[color.rgb]
+            for color, skipped in zip(job.colors, job.transparent)
+        ]
+
+        blocks: "Dict[str, List[str]]" = {}
+        for color_i, x, y, width, height in job.blocks:
+            css_class = classes[color_i]
+            if css_class is None:
+                continue
+
+            blocks.setdefault(css_class, []).append(
+                f"M{(x + 1) * cell_size} {(y + 1) * cell_size}"
+                f"h{width * cell_size}v{height * cell_size}h{-width * cell_size}z"
+            )
+
+        for css_class, paths in blocks.items():
+            self._write(f'<path class="{css_class}" d="{"".join(paths)}"/>\n')
+
+        width, height = job.pattern.width, job.pattern.height
+        if self._minor_lines and width and height:
+            right, bottom = (width + 1) * cell_size, (height + 1) * cell_size
+            lines = [
+                f"M{x} {cell_size}V{bottom}"
+                for x in range(cell_size, right + 1, cell_size)
+            ]
+            lines.extend(
+                f"M{cell_size} {y}H{right}"
+                for y in range(cell_size, bottom + 1, cell_size)
+            )
+            self._write(
+                f'<path d="{"".join(lines)}" stroke-linecap="square" '
+                f'style="stroke:rgb(20,20,20);stroke-width:1;"/>\n'
+            )
+
+    def _write_defs(
+        self, palette: "Palette", size: int, transparent: "List[RGB]"
+    ) -> None:
+        """Write a CSS class for every cell style, and every glyph definition.
+
+        Cells then only reference their class, and their glyph with a `<use>`.
+        Glyphs are numbered after the colors position in the palette, the same
+        for every document of the palette.
+        """
+        styles: "Dict[str, str]" = {}
+        colors: "List[Optional[Color]]" = [None]
+        colors.extend(color for color in palette if color.rgb not in transparent)
+        for color in colors:
+            style = self._cell_style(color)
+            css_class = styles.setdefault(style, f"c{len(styles)}")
+            self._classes[color.rgb if color else None] = css_class
+
+        self._write(
+            "<style>"
+            + "".join(f".{css_class}{{{style}}}" for style, css_class in styles.items())
+            + "</style>\n"
+        )
+
+        if not self._symbols:
+            return
+
+        scale = size / self._scale
+        definitions = []
+        for glyph, color in enumerate(colors[1:], start=1):
+            if glyph not in GLYPHS:
+                break
+
+            path, fill = GLYPHS[glyph]
+            self._glyphs[color.rgb] = f"g{glyph}"
+            definitions.append(
+                f'<path id="g{glyph}" class="glyph" d="{path}" fill="{fill}" '
+                f'transform="scale({scale})"/>'
+            )
+
+        if definitions:
+            self._write(f"<defs>{''.join(definitions)}</defs>\n")
 
-        with open(self.file_name, "a") as f:
-            f.write(data)
+    def _cell_style(self, color: "Optional[Color]") -> str:
+        fill = "fill:rgb(255,255,255);"
+        stroke: "StrokeType" = "stroke:none;"
+
+        if not color:
+            fill = "fill:transparent;"
+        elif not self._black_white:
+            fill = f"fill:{color.rgb.css};"
+
+        if self._merge_cells:
+            # The grid is drawn on its own.
+            return fill
+
+        if self._minor_lines:
+            stroke = "stroke:rgb(20,20,20);stroke-width:1;"
+
+        return f"{fill}{stroke}"
+
+    def _use_glyph(self, color: "Color", x: int, y: int) -> None:
+        glyph_id = self._glyphs.get(color.rgb)
+        if glyph_id:
+            self._write(f'<use xlink:href="#{glyph_id}" x="{x}" y="{y}"/>\n')
+
+    def _write(self, data: str) -> None:
+        self._file.write(data)
 
     def save(self, ext: str) -> None:
         return
@@ -132,199 +282,55 @@ class SVGStitcher(Stitcher):
         step = size * 10
 
         for x in range(start, width, step):
-            self._append_to_file(
-                f"""
-                <line
-                    x1="{x}"
-                    y1="{size}"
-                    x2="{x}"
-                    y2="{height}"
-                    style="stroke:black; stroke-width:2"
-                />
-            """
+            self._write(
+                f'<line x1="{x}" y1="{size}" x2="{x}" y2="{height}" '
+                f'style="stroke:black;stroke-width:2"/>\n'
             )
 
         for y in range(start, height, step):
-            self._append_to_file(
-                f"""
-                <line
-                    x1="{size}"
-                    y1="{y}"
-                    x2="{width}"
-                    y2="{y}"
-                    style="stroke:black; stroke-width:2"
-                />
-            """
+            self._write(
+                f'<line x1="{size}" y1="{y}" x2="{width}" y2="{y}" '
+                f'style="stroke:black;stroke-width:2"/>\n'
             )
 
     def _mid_arrows(self, size: int, width: int, height: int) -> None:
         h = size // 2
 
-        self._append_to_file(
-            f"""
-            <path
-                d="M0 {h}L{size} {h}M{h} 0L{size} {h} {h} {size}"
-                stroke="black"
-                stroke-width="2"
-                fill="none"
-                transform="translate(0 {height // 2})"
-            />
-        """
+        self._write(
+            f'<path d="M0 {h}L{size} {h}M{h} 0L{size} {h} {h} {size}" '
+            f'stroke="black" stroke-width="2" fill="none" '
+            f'transform="translate(0 {height // 2})"/>\n'
         )
-
-        self._append_to_file(
-            f"""
-            <path
-                d="M{h} 0L{h} {size} M{size} {h}L{h} {size} 0 {h}"
-                stroke="black"
-                stroke-width="2"
-                fill="none"
-                transform="translate({width // 2} 0)"
-            />
-        """
+        self._write(
+            f'<path d="M{h} 0L{h} {size} M{size} {h}L{h} {size} 0 {h}" '
+            f'stroke="black" stroke-width="2" fill="none" '
+            f'transform="translate({width // 2} 0)"/>\n'
         )
 
-    @staticmethod
-    def _gen_glyph(color: "Color", coordinate: "Coordinate", scale: float = 1.0) -> str:
-        transform = f"translate({coordinate.x} {coordinate.y}) scale({scale})"
-        fill = ""
-
-        if not color.glyph:
-            color.assign_glyph()
-
-        if color.glyph == 0:
-            # Backslash
-            path = "M4 4L16 16"
-        elif color.glyph == 1:
-            # Forward slash
-            path = "M4 16L16 4M4 10L 16 10"
-        elif color.glyph == 2:
-            # Black little square
-            path = "M7 7L7 13 13 13 13 7Z"
-            fill = "black"
-        elif color.glyph == 3:
-            #
-            path = "M4 4L10 16L16 4 Z"
-        elif color.glyph == 4:
-            # Diagonal cross
-            path = "M4 4L16 16M4 16 L16 4"
-        elif color.glyph == 5:
-            # Square
-            path = "M4 4L4 16 16 16 16 4Z"
-        elif color.glyph == 6:
-            # Upside down black triangle
-            path = "M4 4L10 16L16 4 Z"
-            fill = "black"
-        elif color.glyph == 7:
-            # Black diamond
-            path = "M10 4L6 10 10 16 14 10Z"
-            fill = "black"
-        elif color.glyph == 8:
-            # Little square
-            path = "M8 8L8 12 12 12 12 8Z"
-        elif color.glyph == 9:
-            # 8-way cross
-            path = "M4 4L16 16M4 16 L16 4M10 4L10 16M4 10L16 10"
-        elif color.glyph == 10:
-            # Black Square
-            path = "M4 4L4 16 16 16 16 4Z"
-            fill = "black"
-        else:
-            return ""
-
-        return f"""
-            <path
-                class="glyph"
-                d="{path}"
-                fill="{fill}"
-                transform="{transform}"
-            />
-        """
-
     def _add_key_to_svg(
         self, coordinate: "Coordinate", size: int, color: "Color"
     ) -> None:
-        fill, symbols, stroke = self._get_svg_attributes(coordinate, size, color)
-
-        self._append_to_file(
-            f"""
-            <rect
-                x="0"
-                y="{coordinate.y}"
-                width="{size}"
-                height="{size}"
-                style="{fill}{stroke}"
-            />
-            {symbols}
-        """
+        y = coordinate.y
+        text_y = y + size / 2
+
+        self._write(
+            f'<rect x="0" y="{y}" width="{size}" height="{size}" '
+            f'class="{self._classes[color.rgb]}"/>\n'
         )
+        self._use_glyph(color, coordinate.x, y)
 
         # Color name
-        self._append_to_file(
-            f"""
-            <rect
-                x="{size}"
-                y="{coordinate.y}"
-                width="{size * 10}"
-                height="{size}"
-                style="fill: rgb(255,255,255); stroke: black; stroke-width: 1;"
-            />
-        """
-        )
-        self._append_to_file(
-            f"""
-            <text
-                x="{coordinate.x + size * 1.5}"
-                y="{coordinate.y + size / 2}"
-                fill="black"
-            >
-                {color.name}
-            </text>
-        """
+        self._write(
+            f'<rect x="{size}" y="{y}" width="{size * 10}" height="{size}" '
+            'class="key"/>\n'
+            f'<text x="{coordinate.x + size * 1.5}" y="{text_y}" fill="black">'
+            f"{escape(color.name)}</text>\n"
         )
 
         # Color code
-        self._append_to_file(
-            f"""
-            <rect
-                x="{size * 11}"
-                y="{coordinate.y}"
-                width="{size * 2}"
-                height="{size}"
-                style="fill: rgb(255,255,255); stroke: black; stroke-width: 1;"
-            />
-        """
-        )
-        self._append_to_file(
-            f"""
-            <text
-                x="{size * 11 + (size / 2)}"
-                y="{coordinate.y + size / 2}"
-                fill="black"
-            >
-                {color.code}
-            </text>
-        """
+        self._write(
+            f'<rect x="{size * 11}" y="{y}" width="{size * 2}" height="{size}" '
+            'class="key"/>\n'
+            f'<text x="{size * 11 + (size / 2)}" y="{text_y}" fill="black">'
+            f"{escape(color.code)}</text>\n"
         )
-
-    def _get_svg_attributes(
-        self, coordinate: "Coordinate", size: int, color: "Optional[Color]" = None
-    ) -> "SVGAttributes":
-        fill = "fill:rgb(255,255,255);"
-        stroke: "StrokeType" = "stroke:none;"
-        symbols = ""
-
-        scale = size / self._scale
-
-        if not color:
-            fill = f"fill:transparent;"
-        elif not self._black_white:
-            fill = f"fill:{color.rgb.css};"
-
-        if self._minor_lines:
-            stroke = "stroke:rgb(20,20,20);stroke-width:1;"
-
-        if color and self._symbols:
-            symbols = self._gen_glyph(color, coordinate, scale)
-
-        return fill, symbols, stroke
@@ -1,17 +1,17 @@
 import argparse
 import bisect
+import glob
 import math
 import os
 from bisect import bisect_left
-from typing import TYPE_CHECKING, List
-
-from PIL import Image, ImageColor
+from typing import TYPE_CHECKING, Dict, List, Tuple
 
 from tarraz.logger import logger
-from tarraz.models import ImageSize, RGB
+from tarraz.models import RGB, ImageSize
 
 if TYPE_CHECKING:
     from PIL.Image import Image as ImageType
+
     from tarraz.models import Coordinate, RGBImage
 
 
@@ -21,6 +21,8 @@ parser = argparse.ArgumentParser(
 
 
 def color_choices(value: str) -> "RGB":
+    from PIL import ImageColor
+
     value = value.strip()
 
     try:
@@ -44,6 +46,74 @@ def file_choices(choices: List[str], file_name: str) -> str:
     return file_name
 
 
+def palette_choices(choices: List[str], value: str) -> "Tuple[str, str]":
+    """(name, path) of a palette given as `name=path`."""
+    name, sep, path = value.partition("=")
+    if not sep or not name.strip() or not path:
+        raise argparse.ArgumentTypeError(
+            f"Invalid palette '{value}', expected a name=path value."
+        )
+
+    return name.strip(), file_choices(choices, path)
+
+
+def expand_images(choices: List[str], values: List[str]) -> List[str]:
+    """Image paths from a list of files, directories and glob patterns."""
+    paths: List[str] = []
+
+    for value in values:
+        if os.path.isdir(value):
+            names = sorted(os.listdir(value))
+            candidates = [os.path.join(value, name) for name in names]
+        elif any(c in value for c in "*?["):
+            candidates = sorted(glob.glob(value))
+        else:
+            paths.append(file_choices(choices, value))
+            continue
+
+        paths.extend(
+            path
+            for path in candidates
+            if os.path.isfile(path)
+            and os.path.splitext(path)[1].upper() in map(str.upper, choices)
+        )
+
+    # Every image once, in the order given.
+    return list(dict.fromkeys(paths))
+
+
+def output_names(image_paths: List[str]) -> Dict[str, str]:
+    """Output directory name of every image, unique among the given images.
+
+    Images are named after their file name, images sharing it are named after
+    their path relative to their common directory, then numbered if still equal.
+    """
+    stems: Dict[str, List[str]] = {}
+    for path in image_paths:
+        stems.setdefault(os.path.basename(path).split(".")[0], []).append(path)
+
+    names: Dict[str, str] = {}
+    for stem, paths in stems.items():
+        if len(paths) == 1:
+            names[paths[0]] = stem
+            continue
+
+        common = os.path.commonpath([os.path.abspath(p) for p in paths])
+        for path in paths:
+            directory = os.path.relpath(os.path.dirname(os.path.abspath(path)), common)
+            names[path] = os.path.normpath(os.path.join(directory, stem))
+
+    taken = set()
+    for path in image_paths:
+        name, number = names[path], 1
+        while names[path] in taken:
+            number += 1
+            names[path] = f"{name}_{number}"
+        taken.add(names[path])
+
+    return names
+
+
 def index_of(iterable, element, sort=False) -> int:
     arr = sorted(iterable) if sort else iterable
 
@@ -64,6 +134,8 @@ def euclidean_distance(rgb_1: "RGB", rgb_2: "RGB") -> float:
 
 def generate_image(data: "RGBImage") -> "ImageType":
     """Create a resized image from a given matrix of colors."""
+    from PIL import Image
+
     size = ImageSize(len(data[0]), len(data))
     logger.info(
         f"Generating a new image [{size.width}x{size.height}] for the new colors..."
@@ -77,12 +149,13 @@ def generate_image(data: "RGBImage") -> "ImageType":
     return image
 
 
-def get_neighbours(coordinate: "Coordinate", matrix: List[List[int]]) -> List[int]:
+def get_neighbours(
+    coordinate: "Coordinate", matrix: List[List[int]], width: int = 1
+) -> List[int]:
     x, y = coordinate
     rows = len(matrix)
     cols = len(matrix[0]) if rows else 0
 
-    width = 1
     neighbours: List[int] = []
 
     for i in range(max(0, x - width), min(rows, x + width + 1)):